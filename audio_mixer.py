@@ -0,0 +1,143 @@
+import os
+import wave
+import subprocess
+
+import numpy as np
+
+from ffmpeg_utils import ffmpeg_binary
+
+
+def decode_audio(path, sample_rate=44100, channels=2):
+    """音声ファイルをffmpegでPCM（float32, 形状=(サンプル数, チャンネル数)）にデコードする"""
+    cmd = [
+        ffmpeg_binary(), '-hide_banner', '-loglevel', 'error',
+        '-i', path,
+        '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ac', str(channels), '-ar', str(sample_rate),
+        '-'
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"音声デコードエラー: {result.stderr.decode('utf-8', 'replace').strip()}")
+    pcm = np.frombuffer(result.stdout, dtype=np.int16).reshape(-1, channels)
+    return pcm.astype(np.float32) / 32768.0
+
+
+def write_wav(buffer, path, sample_rate=44100):
+    """float32のPCMを16bitのWAVファイルとして書き出す"""
+    pcm = np.clip(buffer, -1.0, 1.0)
+    pcm = (pcm * 32767.0).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(pcm.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    return path
+
+
+class AudioMixer:
+    def __init__(self, sample_rate=44100, channels=2, bgm_volume=0.5, duck_gain=0.35,
+                 duck_threshold=0.02, attack=0.08, release=0.4):
+        """ナレーションとBGMをまとめて合成するクラスの初期化"""
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+        # BGMの音量とダッキング（ナレーション中にBGMを下げる）設定
+        self.bgm_volume = bgm_volume
+        self.duck_gain = duck_gain  # ナレーション中のBGMの倍率
+        self.duck_threshold = duck_threshold  # ナレーションありと判定する音量（RMS）
+        self.attack = attack  # BGMを下げ始めてから下がりきるまでの秒数
+        self.release = release  # ナレーションが終わってからBGMを戻すまでの秒数
+
+        # デコード済みPCMのメモ（1回の合成の中で同じファイルは1回だけデコード、合成後に解放）
+        self._decoded = {}
+
+    def _load(self, path):
+        """音声ファイルをデコードして返す"""
+        pcm = self._decoded.get(path)
+        if pcm is None:
+            pcm = self._decoded[path] = decode_audio(path, self.sample_rate, self.channels)
+        return pcm
+
+    def mix(self, duration, narration=None, bgm_path=None, sources=None):
+        """ナレーション（開始秒, パス, 最大秒数）のリスト・素材の音声（開始秒, パス, 秒数）のリスト・BGMを合成したPCMを返す"""
+        total = int(round(duration * self.sample_rate))
+        voice = np.zeros((total, self.channels), dtype=np.float32)
+
+        # ナレーションをサンプル位置で配置し、シーンの長さでカット
+        for start, path, max_duration in narration or []:
+            if not path or not os.path.exists(path):
+                continue
+            try:
+                pcm = self._load(path)
+            except Exception as e:
+                print(f"音声追加エラー: {e}")
+                continue
+            offset = int(round(start * self.sample_rate))
+            length = min(len(pcm), int(round(max_duration * self.sample_rate)), total - offset)
+            if length > 0:
+                voice[offset:offset + length] += pcm[:length]
+
+        # 動画素材の音声は、素材の映像と同じく短ければループ・長ければカットする
+        for start, path, source_duration in sources or []:
+            try:
+                pcm = self._load(path)
+            except Exception as e:
+                print(f"素材音声追加エラー: {e}")
+                continue
+            offset = int(round(start * self.sample_rate))
+            length = min(int(round(source_duration * self.sample_rate)), total - offset)
+            if length > 0 and len(pcm) > 0:
+                voice[offset:offset + length] += np.resize(pcm, (length, self.channels))
+
+        if not bgm_path or not os.path.exists(bgm_path):
+            return np.clip(voice, -1.0, 1.0, out=voice)
+
+        try:
+            bgm = self._load(bgm_path)
+        except Exception as e:
+            print(f"BGM追加エラー: {e}")
+            return np.clip(voice, -1.0, 1.0, out=voice)
+        if len(bgm) == 0:
+            return np.clip(voice, -1.0, 1.0, out=voice)
+
+        # BGMはサンプル単位でループ・カット（np.resizeは先頭から繰り返して埋める）
+        bgm = np.resize(bgm, (total, self.channels))
+        bgm *= (self.bgm_volume * self._duck_envelope(voice))[:, None]
+
+        mixed = voice
+        mixed += bgm
+        return np.clip(mixed, -1.0, 1.0, out=mixed)
+
+    def _duck_envelope(self, voice):
+        """ナレーションの有無からBGMの倍率（サンプルごと）を計算する"""
+        total = len(voice)
+        block = max(1, self.sample_rate // 100)  # 10ms単位で判定
+        n_blocks = -(-total // block)
+
+        # ブロックごとのRMSでナレーションの有無を判定
+        padded = np.zeros((n_blocks * block, self.channels), dtype=np.float32)
+        padded[:total] = voice
+        rms = np.sqrt(np.mean(np.square(padded).reshape(n_blocks, -1), axis=1))
+        active = (rms > self.duck_threshold).astype(np.float32)
+
+        # リリース時間だけナレーション区間を後ろに延ばす
+        release_blocks = max(1, int(self.release * 100))
+        active = np.convolve(active, np.ones(release_blocks, dtype=np.float32))[:n_blocks]
+        active = np.minimum(active, 1.0)
+
+        # アタック時間で滑らかに変化させる
+        attack_blocks = max(1, int(self.attack * 100))
+        kernel = np.ones(attack_blocks, dtype=np.float32) / attack_blocks
+        active = np.convolve(active, kernel, mode='same')
+
+        gain = 1.0 - (1.0 - self.duck_gain) * active
+        return np.repeat(gain, block)[:total].astype(np.float32)
+
+    def mix_to_wav(self, path, duration, narration=None, bgm_path=None, sources=None):
+        """合成した音声をWAVファイルに書き出す"""
+        try:
+            return write_wav(self.mix(duration, narration, bgm_path, sources), path, self.sample_rate)
+        finally:
+            # 使い続けるVideoGeneratorにデコード済みのPCMを溜め込まない
+            self._decoded.clear()
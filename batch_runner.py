@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from video_generator import VideoGenerator, available_cores
+
+
+def load_jobs(jobs_path):
+    """JSONLファイルからジョブを読み込む"""
+    jobs = []
+    with open(jobs_path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line)
+            job.setdefault('job_id', f"job_{line_no}")
+            job.setdefault('output_filename', f"{job['job_id']}.mp4")
+            jobs.append(job)
+    return jobs
+
+
+def is_valid_output(path):
+    """出力ファイルが存在し、再生可能な動画かどうかを確認する"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    try:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        infos = ffmpeg_parse_infos(path)
+        return bool(infos.get('duration')) and infos.get('video_found', False)
+    except Exception:
+        return False
+
+
+def run_job(job, output_dir, threads='auto'):
+    """1つのジョブをレンダリングし、結果を返す"""
+    job_output_dir = job.get('output_dir', output_dir)
+    output_path = os.path.join(job_output_dir, job['output_filename'])
+    result = {
+        'job_id': job['job_id'],
+        'output': output_path,
+        'status': None,
+        'started_at': time.time(),
+        'wall_time': 0.0,
+        'cpu_time': 0.0,
+        'error': None
+    }
+
+    # 有効な出力がすでにある場合はスキップ
+    if is_valid_output(output_path):
+        result['status'] = 'skipped'
+        return result
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    # サブディレクトリを含む出力名でも、一時ファイルは同じディレクトリのドットファイルにする
+    name = job['output_filename']
+    partial_filename = os.path.join(os.path.dirname(name), '.' + os.path.basename(name) + '.partial.mp4')
+    profiler = None
+    try:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        generator = VideoGenerator(output_dir=job_output_dir, cache_dir=job.get('cache_dir'))
+        generator.set_encoding_profile(job.get('encoding_profile', 'balanced'), threads=threads)
+        for name in ('scene_duration', 'add_title', 'add_ending'):
+            if name in job:
+                setattr(generator, name, job[name])
+
+        # 計測が有効なジョブは段階ごとの時間を結果に含める
+        profiler = generator.enable_profiling() if job.get('profile') else None
+
+        # 途中で止まっても不完全なファイルが完成品に見えないよう、一時ファイル名で書き出す
+        partial_path = generator.generate_video(
+            job['scenes'],
+            job.get('media_dict', {}),
+            output_filename=partial_filename,
+            bgm_path=job.get('bgm_path'),
+            audio_dict=job.get('audio_dict'),
+            effects_dict=job.get('effects_dict'),
+            hashtags=job.get('hashtags'),
+            segment_cache=job.get('segment_cache', False),
+            streaming=job.get('streaming', False),
+            backend=job.get('backend', 'moviepy')
+        )
+        os.replace(partial_path, output_path)
+        result['status'] = 'ok'
+
+        if profiler is not None:
+            result['stages'] = profiler.report()['totals']
+            result['trace'] = profiler.write_trace(output_path + '.trace.json')
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+        partial_path = os.path.join(job_output_dir, partial_filename)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    finally:
+        result['wall_time'] = round(time.perf_counter() - wall_start, 3)
+        result['cpu_time'] = round(time.process_time() - cpu_start, 3)
+
+    return result
+
+
+class BatchRunner:
+    def __init__(self, output_dir="output", workers=None, results_path=None):
+        """JSONLジョブファイルから動画を一括生成するクラスの初期化"""
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        # 1ジョブあたり4コア程度を目安にワーカー数を決める
+        self.workers = workers if workers else max(1, available_cores() // 4)
+        self.results_path = results_path if results_path else os.path.join(output_dir, 'results.jsonl')
+
+    def run(self, jobs_path):
+        """ジョブを実行し、結果を1ジョブ1行で書き出す"""
+        jobs = load_jobs(jobs_path)
+        threads = max(1, available_cores() // self.workers)
+        results = []
+
+        with open(self.results_path, 'a', encoding='utf-8') as results_file:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    pool.submit(run_job, job, self.output_dir, threads): job
+                    for job in jobs
+                }
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # ワーカープロセス自体が落ちた場合
+                        result = {
+                            'job_id': job['job_id'],
+                            'status': 'error',
+                            'error': f"{type(e).__name__}: {e}"
+                        }
+
+                    results.append(result)
+                    results_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+                    results_file.flush()
+                    print(f"[{result['status']}] {result['job_id']} ({result.get('wall_time', 0)}秒)")
+
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='JSONLジョブファイルから動画を一括生成する')
+    parser.add_argument('jobs', help='ジョブのJSONLファイル')
+    parser.add_argument('--output-dir', default='output', help='出力ディレクトリ')
+    parser.add_argument('--workers', type=int, default=None, help='並列ワーカー数（省略時はコア数から決定）')
+    parser.add_argument('--results', default=None, help='結果を書き出すJSONLファイル')
+    args = parser.parse_args(argv)
+
+    runner = BatchRunner(output_dir=args.output_dir, workers=args.workers, results_path=args.results)
+    results = runner.run(args.jobs)
+
+    failed = [r for r in results if r['status'] == 'error']
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from urllib.parse import urlsplit
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windowsではプロセス間のロックなし
+    fcntl = None
+
+from http_transport import get_transport
+
+# 既定の保存先（環境変数で変更可能、ジョブ間で共有する）
+DEFAULT_STORE_DIR = os.path.join('cache', 'media_store')
+
+# 書き込みバッファ・受信チャンクの大きさ
+CHUNK_SIZE = 1024 * 1024
+
+# URLに拡張子がない場合に、Content-Typeから決める拡張子
+CONTENT_TYPE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/bmp': '.bmp',
+    'video/mp4': '.mp4',
+    'video/quicktime': '.mov',
+    'video/x-msvideo': '.avi'
+}
+
+
+def link_or_copy(source_path, output_path):
+    """ファイルを出力先にハードリンクする（できない場合はコピー）"""
+    if os.path.abspath(source_path) == os.path.abspath(output_path):
+        return output_path
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    try:
+        os.link(source_path, output_path)
+    except OSError:
+        shutil.copyfile(source_path, output_path)
+    return output_path
+
+
+def _extension(url, content_type=None):
+    """URLのパス（なければContent-Type）から保存する実体の拡張子を決める"""
+    ext = os.path.splitext(urlsplit(url).path)[1].lower()
+    if ext or not content_type:
+        return ext
+    return CONTENT_TYPE_EXTENSIONS.get(content_type.split(';')[0].strip().lower(), '')
+
+
+def _content_range(value):
+    """Content-Rangeヘッダー（bytes 開始-終了/全体）を(開始, 終了, 全体)にする（不明な値はNone）"""
+    def number(text):
+        return int(text) if text and text.strip().isdigit() else None
+
+    if not value or not value.startswith('bytes'):
+        return None, None, None
+    span, _, total = value[5:].strip().partition('/')
+    start, _, end = span.partition('-')
+    return number(start), number(end), number(total)
+
+
+class DownloadManager:
+    def __init__(self, store_dir=None, max_workers=4, chunk_size=CHUNK_SIZE, max_attempts=3, transport=None):
+        """メディアを並列・再開可能にダウンロードし、内容のハッシュで共有保存するクラスの初期化"""
+        self.store_dir = store_dir if store_dir else os.getenv('MEDIA_STORE_DIR', DEFAULT_STORE_DIR)
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.max_attempts = max_attempts  # 途中で切れた場合に続きから再試行する回数
+        self.transport = transport if transport else get_transport()
+
+        # objects: 内容のハッシュごとの実体, urls: URLから実体への索引, partial: ダウンロード途中のファイル
+        self.objects_dir = os.path.join(self.store_dir, 'objects')
+        self.urls_dir = os.path.join(self.store_dir, 'urls')
+        self.partial_dir = os.path.join(self.store_dir, 'partial')
+        for path in (self.objects_dir, self.urls_dir, self.partial_dir):
+            os.makedirs(path, exist_ok=True)
+
+        # 同じURLのダウンロードが並行して走らないようにする
+        self._lock = threading.Lock()
+        self._url_locks = {}
+
+        # 統計
+        self.hits = 0
+        self.downloads = 0
+        self.resumed = 0
+        self.bytes_downloaded = 0
+
+    @staticmethod
+    def url_key(url):
+        """URLのキーを返す"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _index_path(self, key):
+        """URL索引ファイルのパスを返す"""
+        return os.path.join(self.urls_dir, key[:2], key + '.json')
+
+    def _object_path(self, digest, ext):
+        """内容のハッシュに対応する実体のパスを返す"""
+        return os.path.join(self.objects_dir, digest[:2], digest + ext)
+
+    def lookup(self, url):
+        """保存済みのURLなら実体のパスを返す（なければNone）"""
+        index_path = self._index_path(self.url_key(url))
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = os.path.join(self.store_dir, entry['path'])
+        return path if os.path.exists(path) else None
+
+    def fetch(self, url):
+        """URLの内容を保存先に取得し、実体のパスを返す（保存済みなら再利用）"""
+        key = self.url_key(url)
+        with self._lock:
+            url_lock = self._url_locks.setdefault(key, threading.Lock())
+
+        # スレッド間はurl_lock、ジョブ（プロセス）間はファイルロックで同じURLの取得を1つにする
+        with url_lock, self._file_lock(key):
+            path = self.lookup(url)
+            if path:
+                self.hits += 1
+                return path
+
+            part_path = os.path.join(self.partial_dir, key + '.part')
+            for attempt in range(self.max_attempts):
+                try:
+                    self._download_part(url, part_path)
+                    break
+                except (IOError, OSError) as e:
+                    # 4xxは再試行しても結果が変わらない
+                    status = getattr(getattr(e, 'response', None), 'status_code', None)
+                    if (status is not None and 400 <= status < 500) or attempt + 1 >= self.max_attempts:
+                        raise
+                    # 受信済みの部分は残し、次の試行で続きから取得する
+                    print(f"ダウンロード再試行 ({attempt + 1}/{self.max_attempts}): {e}")
+
+            self.downloads += 1
+            return self._commit(url, key, part_path)
+
+    @contextmanager
+    def _file_lock(self, key):
+        """同じURLを扱う他のプロセスと排他するファイルロック"""
+        lock_path = os.path.join(self.partial_dir, key + '.lock')
+        with open(lock_path, 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _read_validators(self, part_path):
+        """途中ファイルを受信したときのETag・Last-Modifiedを返す"""
+        try:
+            with open(part_path + '.json', 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_validators(self, part_path, headers):
+        """途中ファイルの内容が変わっていないか確認するためのETag・Last-Modified（と拡張子を決めるContent-Type）を保存する"""
+        validators = {
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'content_type': headers.get('Content-Type')
+        }
+        with open(part_path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(validators, f)
+
+    def _discard_part(self, part_path):
+        """途中ファイルと検証情報を削除する"""
+        for path in (part_path, part_path + '.json'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _download_part(self, url, part_path):
+        """途中ファイルの続き（なければ最初）から受信する"""
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        validators = self._read_validators(part_path) if offset else {}
+        # ETag（強い検証子）を優先し、なければLast-Modifiedで内容が同じか確認する
+        etag = validators.get('etag')
+        validator = etag if etag and not etag.startswith('W/') else validators.get('last_modified')
+        if offset and not validator:
+            # 内容が同じか確認できない途中ファイルは使わない
+            self._discard_part(part_path)
+            offset = 0
+
+        headers = {}
+        if offset:
+            # 内容が変わっていればサーバーは206ではなく200で全体を返す
+            headers = {'Range': f"bytes={offset}-", 'If-Range': validator}
+
+        response = self.transport.get(url, stream=True, headers=headers)
+        try:
+            if offset and response.status_code == 416:
+                # 途中ファイルが全体の長さと一致する場合だけ受信済みとみなす
+                total = _content_range(response.headers.get('Content-Range'))[2]
+                if total == offset:
+                    return
+                self._discard_part(part_path)
+                raise IOError(f"再開位置が不正です: {offset} (全体 {total})")
+            response.raise_for_status()
+
+            if offset and response.status_code == 206:
+                start = _content_range(response.headers.get('Content-Range'))[0]
+                if start != offset:
+                    self._discard_part(part_path)
+                    raise IOError(f"Content-Rangeの開始位置が一致しません: {start} != {offset}")
+                self.resumed += 1
+                mode = 'ab'
+            else:
+                # Rangeに対応していない・内容が変わった場合は最初から受信する
+                mode = 'wb'
+                self._write_validators(part_path, response.headers)
+
+            with open(part_path, mode, buffering=self.chunk_size) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                    self.bytes_downloaded += len(chunk)
+        finally:
+            response.close()
+
+    def _commit(self, url, key, part_path):
+        """受信済みファイルを内容のハッシュで保存先へ移し、URL索引を書き込む"""
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for block in iter(lambda: f.read(self.chunk_size), b''):
+                digest.update(block)
+        digest = digest.hexdigest()
+
+        ext = _extension(url, self._read_validators(part_path).get('content_type'))
+        object_path = self._object_path(digest, ext)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+
+        if os.path.exists(object_path):
+            # 別のURLで同じ内容を保存済み
+            os.remove(part_path)
+        else:
+            os.replace(part_path, object_path)
+        if os.path.exists(part_path + '.json'):
+            os.remove(part_path + '.json')
+
+        index_path = self._index_path(key)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.json', dir=os.path.dirname(index_path))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': url,
+                'sha256': digest,
+                'path': os.path.relpath(object_path, self.store_dir)
+            }, f)
+        os.replace(temp_path, index_path)
+
+        return object_path
+
+    def download(self, url, save_path):
+        """URLの内容を取得し、save_pathにリンクして返す"""
+        return link_or_copy(self.fetch(url), save_path)
+
+    def download_many(self, items, max_workers=None):
+        """(URL, 保存先)のリストを並列でダウンロードし、保存先（失敗時はNone）のリストを返す"""
+        items = list(items)
+        workers = max(1, min(max_workers or self.max_workers, len(items) or 1))
+
+        def run(item):
+            url, save_path = item
+            try:
+                return self.download(url, save_path)
+            except Exception as e:
+                print(f"メディアダウンロードエラー: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run, items))
+
+    def stats(self):
+        """ダウンロードの統計を返す"""
+        return {
+            'hits': self.hits,
+            'downloads': self.downloads,
+            'resumed': self.resumed,
+            'bytes_downloaded': self.bytes_downloaded
+        }
+
+
+_shared_manager = None
+_shared_lock = threading.Lock()
+
+
+def get_download_manager():
+    """プロセス内で共有するDownloadManagerを返す"""
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = DownloadManager()
+        return _shared_manager
@@ -0,0 +1,171 @@
+import numpy as np
+
+# 色エフェクトの3x3行列（出力RGB = 行列 x 入力RGB）
+COLOR_MATRICES = {
+    'sepia': np.array([
+        [0.393, 0.769, 0.189],
+        [0.349, 0.686, 0.168],
+        [0.272, 0.534, 0.131]
+    ], dtype=np.float32),
+    'black_white': np.array([
+        [0.299, 0.587, 0.114],
+        [0.299, 0.587, 0.114],
+        [0.299, 0.587, 0.114]
+    ], dtype=np.float32)
+}
+
+# エフェクト名ごとの設定（compile_chainで1つの処理にまとめる）
+EFFECT_STEPS = {
+    'none': {},
+    'fade': {'fade_in': 0.5, 'fade_out': 0.5},
+    'fadein': {'fade_in': 0.5},
+    'fadeout': {'fade_out': 0.5},
+    'mirror_x': {'flip_x': True},
+    'mirror_y': {'flip_y': True},
+    'black_white': {'color': 'black_white'},
+    'sepia': {'color': 'sepia'},
+    'bright': {'gain': 1.2},
+    'dark': {'gain': 0.8}
+}
+
+
+class EffectChain:
+    def __init__(self, color=None, gain=1.0, flip_x=False, flip_y=False, fade_in=0.0, fade_out=0.0):
+        """複数のエフェクトを1回のフレーム処理にまとめたチェーンの初期化"""
+        # 色変換は3x3行列（なければNone）とスカラーの明るさ倍率
+        self.matrix = None
+        if color is not None:
+            self.matrix = COLOR_MATRICES[color] if isinstance(color, str) else np.asarray(color, dtype=np.float32)
+        self.gain = gain
+
+        # 反転はコピーなしのビューで行う
+        self.flip_x = flip_x
+        self.flip_y = flip_y
+
+        # フェードは時刻ごとの明るさ倍率として事前計算する
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+
+    @property
+    def is_identity(self):
+        """何も変化しないチェーンかどうか"""
+        return (self.matrix is None and self.gain == 1.0 and not self.flip_x and not self.flip_y
+                and not self.fade_in and not self.fade_out)
+
+    @property
+    def fade_duration(self):
+        """フェードにかかる時間（先頭・末尾）"""
+        return self.fade_in, self.fade_out
+
+    def then(self, other):
+        """別のチェーンを後ろに連結したチェーンを返す"""
+        if self.matrix is None:
+            matrix = other.matrix
+        elif other.matrix is None:
+            matrix = self.matrix
+        else:
+            matrix = other.matrix @ self.matrix
+        return EffectChain(
+            color=matrix,
+            gain=self.gain * other.gain,
+            flip_x=self.flip_x != other.flip_x,
+            flip_y=self.flip_y != other.flip_y,
+            fade_in=max(self.fade_in, other.fade_in),
+            fade_out=max(self.fade_out, other.fade_out)
+        )
+
+    def static_range(self, duration):
+        """入力が静止画なら出力も変化しない区間（フェード以外）の開始・終了時刻を返す"""
+        return self.fade_in, duration - self.fade_out
+
+    def frame_gains(self, duration, fps):
+        """フレームごとの明るさ倍率（フェード込み）を計算する"""
+        n_frames = int(np.ceil(duration * fps)) + 1
+        t = np.arange(n_frames, dtype=np.float64) / fps
+        level = np.ones(n_frames)
+        if self.fade_in:
+            level = np.minimum(level, t / self.fade_in)
+        if self.fade_out:
+            level = np.minimum(level, (duration - t) / self.fade_out)
+        return np.clip(level, 0.0, 1.0) * self.gain
+
+    def make_filter(self, duration, fps):
+        """clip.flに渡すフレーム処理関数を作成する"""
+        gains = self.frame_gains(duration, fps)
+        matrix = self.matrix
+        flip_x, flip_y = self.flip_x, self.flip_y
+        ramp = np.arange(256, dtype=np.float32)
+        luts = {}
+
+        def apply(get_frame, t):
+            frame = get_frame(t)
+
+            # 反転（ビューなのでコピーは発生しない）
+            if flip_y:
+                frame = frame[::-1]
+            if flip_x:
+                frame = frame[:, ::-1]
+
+            index = min(max(int(t * fps + 1e-6), 0), len(gains) - 1)
+            gain = float(gains[index])
+
+            if matrix is None:
+                if gain == 1.0:
+                    return frame
+                # 明るさ・フェードは256要素のLUTで1回引くだけ
+                lut = luts.get(index)
+                if lut is None:
+                    lut = luts[index] = np.clip(ramp * gain + 0.5, 0, 255).astype(np.uint8)
+                return lut[frame]
+
+            # 色変換は明るさ倍率を行列に畳み込んで1回の行列演算で処理
+            out = np.dot(frame, (matrix * gain).T)
+            np.clip(out, 0, 255, out=out)
+            return out.astype(np.uint8)
+
+        return apply
+
+    def ffmpeg_filters(self, duration):
+        """同じ処理をffmpegのフィルター（文字列のリスト）として返す"""
+        filters = []
+        if self.flip_y:
+            filters.append('vflip')
+        if self.flip_x:
+            filters.append('hflip')
+
+        # 色変換と明るさは1つのcolorchannelmixerにまとめる
+        if self.matrix is not None or self.gain != 1.0:
+            matrix = self.matrix if self.matrix is not None else np.eye(3, dtype=np.float32)
+            coefficients = (matrix * self.gain).flatten()
+            names = ['rr', 'rg', 'rb', 'gr', 'gg', 'gb', 'br', 'bg', 'bb']
+            filters.append('colorchannelmixer=' + ':'.join(
+                f"{name}={value:.4f}" for name, value in zip(names, coefficients)
+            ))
+
+        if self.fade_in:
+            filters.append(f"fade=t=in:st=0:d={self.fade_in}")
+        if self.fade_out:
+            filters.append(f"fade=t=out:st={max(0.0, duration - self.fade_out):.4f}:d={self.fade_out}")
+        return filters
+
+    def __call__(self, clip, fps=None):
+        """クリップにエフェクトを適用する"""
+        if self.is_identity:
+            return clip
+        fps = fps or getattr(clip, 'fps', None) or 30
+        return clip.fl(self.make_filter(clip.duration, fps))
+
+
+def compile_chain(names):
+    """エフェクト名のリストを1つのEffectChainにまとめる（不明な名前はKeyError）"""
+    if isinstance(names, str):
+        names = [names]
+    chain = EffectChain()
+    for name in names:
+        chain = chain.then(EffectChain(**EFFECT_STEPS[name]))
+    return chain
+
+
+def default_effects():
+    """エフェクト名とEffectChainの辞書を作成する"""
+    return {name: compile_chain([name]) for name in EFFECT_STEPS}
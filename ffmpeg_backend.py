@@ -0,0 +1,295 @@
+import os
+import math
+import shutil
+import tempfile
+import subprocess
+
+import numpy as np
+from PIL import Image
+
+from ffmpeg_utils import ffmpeg_binary, run_ffmpeg
+
+# VideoGeneratorと同じ拡張子でメディアの種類を判定する
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi')
+
+
+class FilterGraphRenderer:
+    def __init__(self, generator):
+        """VideoGeneratorのシーン定義を1つのffmpegフィルターグラフとして書き出すクラスの初期化"""
+        # 形状・テキスト・エフェクト・エンコード設定はVideoGeneratorのものを使う
+        self.generator = generator
+        self.width = generator.width
+        self.height = generator.height
+        self.fps = generator.fps
+
+        self._inputs = []
+        self._filters = []
+        self._work_dir = None
+
+    def render(self, segment_specs, output_path, bgm_path=None):
+        """全セグメントを1回のffmpeg実行でレンダリングする"""
+        if not segment_specs:
+            raise ValueError("レンダリングするセグメントがありません")
+        generator = self.generator
+        self._inputs = []
+        self._filters = []
+        self._work_dir = tempfile.mkdtemp(prefix='filtergraph_', dir=generator.output_dir)
+        mixed_audio = None
+        try:
+            # 各セグメントのフィルターを作成（メディアは先読みしながら解決）
+            labels = []
+            total = 0
+            with generator._stage('build_graph', segments=len(segment_specs)):
+                for spec in generator._iter_resolved(segment_specs):
+                    labels.append(self._segment(spec, len(labels), total))
+                    total += spec['duration']
+
+            # セグメントを連結
+            self._filters.append(
+                ''.join(f"[{label}]" for label in labels)
+                + f"concat=n={len(labels)}:v=1:a=0,format=yuv420p[vout]"
+            )
+
+            # ナレーションとBGMはmoviepy版と同じ合成音声を使う
+            mixed_audio = generator._mix_audio(segment_specs, output_path, bgm_path)
+
+            script_path = os.path.join(self._work_dir, 'graph.txt')
+            with open(script_path, 'w', encoding='utf-8') as f:
+                f.write(';\n'.join(self._filters))
+
+            args = []
+            for input_args in self._inputs:
+                args += input_args
+            audio_index = len(self._inputs)
+            if mixed_audio:
+                args += ['-i', mixed_audio]
+
+            args += ['-filter_complex_script', script_path, '-map', '[vout]']
+            if mixed_audio:
+                args += ['-map', f'{audio_index}:a', '-c:a', 'aac', '-b:a', generator.encoding['audio_bitrate']]
+            args += self._encoder_args()
+            args += ['-t', f"{total:.4f}", '-movflags', '+faststart', output_path]
+
+            with generator._stage('encode', segment='all', backend='ffmpeg'):
+                run_ffmpeg(args)
+        finally:
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+            self._work_dir = None
+            if mixed_audio and os.path.exists(mixed_audio):
+                os.remove(mixed_audio)
+            generator.release_clips()
+
+        return output_path
+
+    def _encoder_args(self):
+        """エンコード設定をffmpegの引数にする"""
+        settings = self.generator._encoder_settings()
+        args = ['-c:v', settings['codec'], '-preset', settings['preset'], '-r', str(settings['fps'])]
+        if settings['bitrate']:
+            args += ['-b:v', settings['bitrate']]
+        elif settings['crf'] is not None:
+            args += ['-crf', str(settings['crf'])]
+        if settings['tune']:
+            args += ['-tune', settings['tune']]
+        args += ['-threads', str(self.generator._resolve_threads())]
+        return args
+
+    def _add_input(self, args):
+        """入力を追加し、その番号を返す"""
+        self._inputs.append(list(args))
+        return len(self._inputs) - 1
+
+    def _still_input(self, path, duration):
+        """静止画を指定の長さの映像として入力する"""
+        return self._add_input([
+            '-loop', '1', '-framerate', str(self.fps), '-t', f"{duration:.4f}", '-i', path
+        ])
+
+    def _color_source(self, duration):
+        """黒一色の映像を入力する"""
+        return self._add_input([
+            '-f', 'lavfi', '-t', f"{duration:.4f}",
+            '-i', f"color=c=black:s={self.width}x{self.height}:r={self.fps}"
+        ])
+
+    def _frame_span(self, start, end):
+        """全体の時間軸で[start, end)に入るフレームの数と、最初のフレームの区間内での時刻を返す
+
+        moviepy版は連結したクリップを全体の時刻t=n/fpsで読み出すため、区間の長さがフレームの
+        倍数でないときも同じフレームを割り当てる（区間ごとに切り上げると1フレームずつずれていく）。
+        """
+        first = math.ceil(start * self.fps - 1e-6)
+        last = math.ceil(end * self.fps - 1e-6)
+        return max(0, last - first), max(0.0, first / self.fps - start)
+
+    def _normalize(self, duration, offset=0.0):
+        """連結できるようにフレームレート・画素形式・タイムスタンプを揃える"""
+        start = f"start={offset:.6f}:" if offset > 0 else ''
+        return (
+            f"trim={start}duration={duration:.6f},setpts=PTS-STARTPTS,"
+            f"fps={self.fps},format=rgb24,setsar=1"
+        )
+
+    def _segment(self, spec, index, start=0.0):
+        """セグメント（全体の時間軸でstart秒から）のフィルターを作成し、出力ラベルを返す"""
+        generator = self.generator
+        duration = spec['duration']
+        label = f"seg{index}"
+
+        if spec['kind'] == 'text':
+            base = f"base{index}"
+            frames, _ = self._frame_span(start, start + duration)
+            source = self._color_source(duration + 1.0 / self.fps)
+            self._filters.append(f"[{source}:v]{self._normalize(frames / self.fps)}[{base}]")
+            raster = generator._text_raster(
+                spec['text'], 'white', bg_color=spec['bg_color'], fontsize=spec['fontsize']
+            )
+            self._overlay_text(base, raster, 'center', duration, label)
+            return label
+
+        # メディアごとの映像を作成して連結
+        media_labels = []
+        media_paths = spec['media_paths']
+        media_duration = duration / len(media_paths) if media_paths else duration
+        for i, media_path in enumerate(media_paths):
+            media_label = f"m{index}_{i}"
+            # create_scene_clipと同じく、サポートされているメディアだけを順に並べる
+            media_start = start + len(media_labels) * media_duration
+            span = self._frame_span(media_start, media_start + media_duration)
+            lower = media_path.lower()
+            if lower.endswith(IMAGE_EXTENSIONS):
+                self._image_media(media_path, media_duration, span, i % 2 == 0, spec['effect'], media_label)
+            elif lower.endswith(VIDEO_EXTENSIONS):
+                self._video_media(media_path, media_duration, span, spec['effect'], media_label)
+            else:
+                # サポートされていないメディア形式
+                continue
+            media_labels.append(media_label)
+
+        base = f"base{index}"
+        if not media_labels:
+            frames, _ = self._frame_span(start, start + duration)
+            source = self._color_source(duration + 1.0 / self.fps)
+            self._filters.append(f"[{source}:v]{self._normalize(frames / self.fps)}[{base}]")
+        elif len(media_labels) == 1:
+            base = media_labels[0]
+        else:
+            self._filters.append(
+                ''.join(f"[{media_label}]" for media_label in media_labels)
+                + f"concat=n={len(media_labels)}:v=1:a=0[{base}]"
+            )
+
+        raster = generator._text_raster(spec['text'], 'white', bg_color=(0, 0, 0, 128))
+        self._overlay_text(base, raster, 'bottom', duration, label)
+        return label
+
+    def _image_media(self, image_path, duration, span, zoom, effect, label):
+        """画像の映像（リサイズ・クロップ・ズーム・エフェクト）のフィルターを作成する（spanはフレーム数と開始時刻）"""
+        generator = self.generator
+        frames, _ = span
+        with Image.open(image_path) as src:
+            size, (x1, y1, x2, y2) = generator._cover_geometry(src.width, src.height)
+
+        source = self._still_input(image_path, duration + 1.0 / self.fps)
+        filters = [
+            'format=rgb24',
+            f"scale={size[0]}:{size[1]}:flags=lanczos",
+            f"crop={x2 - x1}:{y2 - y1}:{x1}:{y1}",
+            'setsar=1'
+        ]
+        if zoom:
+            # KenBurnsと同じく1.0→1.05倍へイーズイン・アウトでズーム（中央固定）
+            n_frames = max(1, int(round(duration * self.fps)))
+            progress = f"min(on/{max(1, n_frames - 1)},1)"
+            filters.append(
+                f"zoompan=z='1+0.05*{progress}*{progress}*(3-2*{progress})'"
+                f":x='(iw-iw/zoom)/2':y='(ih-ih/zoom)/2'"
+                f":d=1:s={self.width}x{self.height}:fps={self.fps}"
+            )
+        filters.append(self._normalize(frames / self.fps))
+
+        # 画像では不明なエフェクトはフェードイン・アウトにする（moviepy版と同じ）
+        chain = generator._effect_chain(effect, default='fade')
+        if chain is not None:
+            filters += chain.ffmpeg_filters(duration)
+        self._filters.append(f"[{source}:v]" + ','.join(filters) + f"[{label}]")
+
+    def _video_media(self, video_path, duration, span, effect, label):
+        """動画の映像（ループ・カット・エフェクト）のフィルターを作成する（spanはフレーム数と開始時刻）"""
+        generator = self.generator
+        normalized = generator._normalized_video(video_path)
+        frames, offset = span
+
+        # 短い動画はループ、長い動画は先頭からカット（moviepy版と同じ時刻のフレームから始める）
+        source = self._add_input(['-stream_loop', '-1', '-t', f"{duration + 1.0 / self.fps:.4f}", '-i', normalized])
+        filters = [self._normalize(frames / self.fps, offset)]
+        chain = generator._effect_chain(effect)
+        if chain is not None:
+            filters += chain.ffmpeg_filters(duration)
+        self._filters.append(f"[{source}:v]" + ','.join(filters) + f"[{label}]")
+
+    def _overlay_text(self, base, raster, position, duration, label):
+        """描画済みテキストをフェードイン・アウトしながら重ねる"""
+        path = os.path.join(self._work_dir, f"{label}_text.png")
+        Image.fromarray(np.ascontiguousarray(raster), 'RGBA').save(path)
+        x, y = self.generator._text_position(position, raster.shape[1], raster.shape[0])
+
+        source = self._still_input(path, duration)
+        text = f"{label}_text"
+        self._filters.append(
+            f"[{source}:v]format=rgba,trim=duration={duration:.4f},setpts=PTS-STARTPTS,"
+            f"fade=t=in:st=0:d=0.5:alpha=1,"
+            f"fade=t=out:st={max(0.0, duration - 0.5):.4f}:d=0.5:alpha=1[{text}]"
+        )
+        self._filters.append(
+            f"[{base}][{text}]overlay=x={x}:y={y}:format=rgb:eof_action=pass,format=rgb24[{label}]"
+        )
+
+
+def _read_frames(path, size):
+    """動画を指定サイズのRGBフレームとして順に読み込む"""
+    width, height = size
+    cmd = [
+        ffmpeg_binary(), '-hide_banner', '-loglevel', 'error',
+        '-i', path,
+        '-vf', f"scale={width}:{height}:flags=area",
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'
+    ]
+    frame_bytes = width * height * 3
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            data = process.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            yield np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+def compare_videos(path_a, path_b, size=(270, 480)):
+    """2つの動画をフレームごとに比較し、PSNRと平均絶対誤差を返す"""
+    psnrs = []
+    diffs = []
+    frames_a = _read_frames(path_a, size)
+    frames_b = _read_frames(path_b, size)
+    for frame_a, frame_b in zip(frames_a, frames_b):
+        error = frame_a.astype(np.float32) - frame_b.astype(np.float32)
+        mse = float(np.mean(error * error))
+        psnrs.append(float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse))
+        diffs.append(float(np.mean(np.abs(error))))
+    frames_a.close()
+    frames_b.close()
+
+    if not psnrs:
+        raise ValueError("比較できるフレームがありません")
+    finite = [value for value in psnrs if value != float('inf')]
+    return {
+        'frames': len(psnrs),
+        'mean_psnr': float(np.mean(finite)) if finite else float('inf'),
+        'min_psnr': min(psnrs),
+        'mean_abs_diff': float(np.mean(diffs)),
+        'max_abs_diff': max(diffs)
+    }
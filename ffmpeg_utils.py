@@ -0,0 +1,61 @@
+import os
+import subprocess
+import tempfile
+
+
+def ffmpeg_binary():
+    """moviepyが使用しているffmpegの実行ファイルを返す"""
+    from moviepy.config import get_setting
+    return get_setting("FFMPEG_BINARY")
+
+
+def run_ffmpeg(args):
+    """ffmpegを実行する（失敗時は例外を送出）"""
+    cmd = [ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error'] + list(args)
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg実行エラー: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return result
+
+
+def write_concat_list(segment_paths, list_path):
+    """concat demuxer用のファイルリストを書き出す"""
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in segment_paths:
+            # シングルクォートはconcat demuxerの書式に合わせてエスケープ
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_path
+
+
+def concat_segments(segment_paths, output_path, audio_path=None, audio_bitrate=None):
+    """エンコード済みセグメントをストリームコピーで連結する（音声ファイルがあれば付ける）"""
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    fd, list_path = tempfile.mkstemp(prefix='concat_', suffix='.txt', dir=out_dir)
+    os.close(fd)
+
+    try:
+        write_concat_list(segment_paths, list_path)
+        args = ['-f', 'concat', '-safe', '0', '-i', list_path]
+
+        if audio_path:
+            # 映像はコピーのまま、音声のみエンコード
+            args += [
+                '-i', audio_path,
+                '-map', '0:v', '-map', '1:a',
+                '-c:v', 'copy',
+                '-c:a', 'aac'
+            ]
+            if audio_bitrate:
+                args += ['-b:a', audio_bitrate]
+            args += ['-shortest']
+        else:
+            args += ['-c', 'copy']
+
+        args += ['-movflags', '+faststart', output_path]
+        run_ffmpeg(args)
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
+
+    return output_path
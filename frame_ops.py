@@ -0,0 +1,89 @@
+import numpy as np
+from PIL import Image
+
+
+class KenBurns:
+    def __init__(self, frame, duration, fps, zoom_start=1.0, zoom_end=1.05, pan=(0.0, 0.0)):
+        """1枚の画像からズーム・パンのフレームを生成するクラスの初期化"""
+        # 元画像は1つのバッファだけを保持する
+        self.source = Image.fromarray(frame)
+        self.size = self.source.size
+        self.fps = fps
+
+        # フレームごとの切り出し範囲を事前に計算（イーズイン・アウト）
+        width, height = self.size
+        n_frames = max(1, int(round(duration * fps)))
+        progress = np.linspace(0.0, 1.0, n_frames)
+        eased = progress * progress * (3 - 2 * progress)
+        zoom = zoom_start + (zoom_end - zoom_start) * eased
+
+        window_w = width / zoom
+        window_h = height / zoom
+        # panは-1〜1で、ズームで余った範囲のどこへ移動するかを表す
+        center_x = width / 2 + pan[0] * (width - window_w) / 2 * eased
+        center_y = height / 2 + pan[1] * (height - window_h) / 2 * eased
+
+        self.boxes = np.stack([
+            center_x - window_w / 2,
+            center_y - window_h / 2,
+            center_x + window_w / 2,
+            center_y + window_h / 2
+        ], axis=1)
+
+    def make_frame(self, t):
+        """時刻tのフレームを返す"""
+        index = min(max(int(t * self.fps + 1e-6), 0), len(self.boxes) - 1)
+        box = tuple(float(v) for v in self.boxes[index])
+        # 切り出しと拡大を1回のリサンプリングで行う（Pillow-SIMDがあれば自動的に利用される）
+        # 毎回新しいフレームなので、書き込み可能な配列にしてオーバーレイをその場で合成できるようにする
+        return np.array(self.source.resize(self.size, Image.BILINEAR, box=box))
+
+
+def fade_gain(t, duration, fade_duration=0.5):
+    """フェードイン・アウトの不透明度（0〜255の整数）を返す"""
+    if fade_duration <= 0:
+        return 255
+    level = min(1.0, t / fade_duration, (duration - t) / fade_duration)
+    return int(round(255 * max(0.0, level)))
+
+
+class OverlayPatch:
+    def __init__(self, rgba, x, y, frame_size):
+        """フレームに重ねる静止オーバーレイ（乗算済みアルファ）の初期化"""
+        frame_width, frame_height = frame_size
+        height, width = rgba.shape[:2]
+
+        # フレーム内に収まる範囲だけを保持する
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(frame_width, x + width), min(frame_height, y + height)
+        self.box = (y0, y1, x0, x1)
+        self.empty = x1 <= x0 or y1 <= y0
+
+        patch = rgba[y0 - y:y1 - y, x0 - x:x1 - x]
+        alpha = patch[:, :, 3:4].astype(np.uint16)
+        # 乗算済みのRGBと、下地に掛ける係数（255 - α）を事前に計算
+        self.premultiplied = (patch[:, :, :3].astype(np.uint16) * alpha + 127) // 255
+        self.alpha = alpha
+        self.inverse_alpha = 255 - alpha
+
+    def blend_into(self, frame, gain=255):
+        """uint8のフレームに、オーバーレイの範囲だけを整数演算で直接合成する"""
+        if self.empty or gain <= 0:
+            return frame
+
+        y0, y1, x0, x1 = self.box
+        region = frame[y0:y1, x0:x1]
+
+        if gain >= 255:
+            premultiplied, inverse_alpha = self.premultiplied, self.inverse_alpha
+        else:
+            # フェード中は同じパッチにスカラーの不透明度を掛ける
+            premultiplied = (self.premultiplied * gain + 127) // 255
+            inverse_alpha = 255 - (self.alpha * gain + 127) // 255
+
+        blended = region * inverse_alpha
+        blended += 127
+        blended //= 255
+        blended += premultiplied
+        region[:] = blended
+        return frame
@@ -0,0 +1,123 @@
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+from hashtag_generator import HashtagGenerator
+
+# 合成テキストの種類（件数, 文字数）
+TEXT_SETS = {
+    'short_scripts': (5000, 300),
+    'long_scripts': (200, 10000)
+}
+
+
+def legacy_detect_categories(generator, text):
+    """変更前の判定（呼び出しごとにキーワード表を作り、全キーワードを順に検索）"""
+    category_keywords = {category: list(keywords) for category, keywords in generator.category_keywords.items()}
+    category_scores = {category: 0 for category in generator.hashtag_dict.keys()}
+    for category, keywords in category_keywords.items():
+        for keyword in keywords:
+            if keyword in text:
+                category_scores[category] += 1
+    sorted_categories = sorted(category_scores.items(), key=lambda x: x[1], reverse=True)
+    detected_categories = [category for category, score in sorted_categories if score > 0][:3]
+    return detected_categories or ['一般']
+
+
+def make_texts(generator, count, length, seed=0):
+    """ひらがなの文にキーワードを混ぜた台本風のテキストを作る"""
+    rng = random.Random(seed)
+    keywords = [keyword for keywords in generator.category_keywords.values() for keyword in keywords]
+    hiragana = [chr(code) for code in range(0x3041, 0x3094)] + ['。', '、']
+    texts = []
+    for _ in range(count):
+        parts = []
+        size = 0
+        while size < length:
+            if rng.random() < 0.03:
+                part = rng.choice(keywords)
+            else:
+                part = ''.join(rng.choice(hiragana) for _ in range(rng.randint(1, 6)))
+            parts.append(part)
+            size += len(part)
+        texts.append(''.join(parts)[:length])
+    return texts
+
+
+def _best_time(func, texts, repeat):
+    """全テキストを処理する時間の最小値（ミリ秒）を返す"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            func(text)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 2)
+
+
+def run_benchmarks(repeat=3):
+    """変更前後のカテゴリー判定とバッチ生成の時間を計測し、結果の辞書を返す"""
+    generator = HashtagGenerator()
+    results = []
+    for name, (count, length) in TEXT_SETS.items():
+        texts = make_texts(generator, count, length)
+        mismatches = sum(
+            legacy_detect_categories(generator, text) != generator._detect_categories(text)
+            for text in texts
+        )
+        legacy_ms = _best_time(lambda text: legacy_detect_categories(generator, text), texts, repeat)
+        current_ms = _best_time(generator._detect_categories, texts, repeat)
+
+        started = time.perf_counter()
+        generator.generate_hashtags_batch(texts, seed=0)
+        batch_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        results.append({
+            'name': name,
+            'texts': count,
+            'length': length,
+            'legacy_ms': legacy_ms,
+            'current_ms': current_ms,
+            'speedup': round(legacy_ms / current_ms, 2) if current_ms else None,
+            'batch_ms': batch_ms,
+            'mismatches': mismatches
+        })
+        print(f"{name}: {legacy_ms} ms -> {current_ms} ms", file=sys.stderr)
+
+    return {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ハッシュタグのカテゴリー判定を変更前の方式と比較して計測する')
+    parser.add_argument('--output', default=None, help='結果のJSONを書き出すファイル（省略時は標準出力）')
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（最小値を採用）')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(repeat=args.repeat)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    # 判定結果が変更前と異なる場合、または遅くなった場合は失敗
+    failed = any(result['mismatches'] or result['current_ms'] > result['legacy_ms'] for result in report['results'])
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -53,9 +53,44 @@ class HashtagGenerator:
             '#いいね返し', '#フォロー返します', '#トレンド', '#初心者', '#初投稿',
             '#フォロバ', '#拡散希望', '#動画', '#viral', '#trend'
         ]
+        
+        # 各カテゴリーのキーワード
+        self.category_keywords = {
+            '料理': ['料理', 'レシピ', '食べ物', '調理', '美味しい', 'おいしい', '食材', '食事', 'クッキング', '味'],
+            '旅行': ['旅行', '観光', '旅', '景色', '絶景', '名所', '観光地', '海外', '国内', 'ツアー', '旅程'],
+            'ファッション': ['ファッション', '服', 'コーデ', 'スタイル', 'ブランド', 'アパレル', '着こなし', 'トレンド'],
+            'ビューティー': ['メイク', '化粧', 'コスメ', '美容', 'スキンケア', 'ヘアスタイル', 'ネイル', '肌'],
+            'エンタメ': ['映画', 'ドラマ', 'アニメ', '音楽', '漫画', 'ゲーム', 'エンタメ', '芸能', '俳優', '歌手'],
+            'スポーツ': ['スポーツ', '運動', 'トレーニング', '筋トレ', 'ワークアウト', 'ヨガ', 'ランニング', '健康'],
+            'ライフスタイル': ['暮らし', '生活', '日常', 'インテリア', '収納', '整理', '断捨離', 'シンプル'],
+            'ビジネス': ['ビジネス', '仕事', '起業', '副業', 'フリーランス', '在宅', 'リモート', '投資', '稼ぐ'],
+            '教育': ['勉強', '学習', '教育', '受験', '資格', '英語', 'プログラミング', '学校', '大学', '高校']
+        }
+        
+        # キーワードを先頭の文字ごとにまとめておく（先頭の文字がテキストになければまとめて飛ばせる）
+        keyword_groups = {}
+        for category, keywords in self.category_keywords.items():
+            for keyword in keywords:
+                keyword_groups.setdefault(keyword[0], []).append((keyword, category))
+        self._keyword_groups = tuple(
+            (first_char, tuple(items)) for first_char, items in keyword_groups.items()
+        )
     
     def generate_hashtags(self, text, categories=None, max_tags=15):
         """テキストからハッシュタグを生成する"""
+        return self._generate_hashtags(text, categories, max_tags, random)
+    
+    def generate_hashtags_batch(self, texts, categories=None, max_tags=15, seed=None):
+        """複数のテキストからハッシュタグをまとめて生成する（seedを指定すると結果が再現可能）"""
+        results = []
+        for i, text in enumerate(texts):
+            # テキストごとに独立した乱数を使い、順番や件数に結果が左右されないようにする
+            rng = random.Random(f"{seed}:{i}") if seed is not None else random.Random()
+            results.append(self._generate_hashtags(text, categories, max_tags, rng))
+        return results
+    
+    def _generate_hashtags(self, text, categories, max_tags, rng):
+        """指定した乱数でハッシュタグを生成する"""
         # カテゴリーが指定されていない場合は、テキストから推測
         if not categories:
             categories = self._detect_categories(text)
@@ -65,43 +100,33 @@ class HashtagGenerator:
         for category in categories:
             if category in self.hashtag_dict:
                 # カテゴリーごとに3〜5個のハッシュタグをランダムに選択
-                num_tags = min(random.randint(3, 5), len(self.hashtag_dict[category]))
-                category_tags = random.sample(self.hashtag_dict[category], num_tags)
+                num_tags = min(rng.randint(3, 5), len(self.hashtag_dict[category]))
+                category_tags = rng.sample(self.hashtag_dict[category], num_tags)
                 selected_hashtags.extend(category_tags)
         
         # 人気のハッシュタグから2〜3個をランダムに追加
-        num_popular = min(random.randint(2, 3), len(self.popular_hashtags))
-        popular_tags = random.sample(self.popular_hashtags, num_popular)
+        num_popular = min(rng.randint(2, 3), len(self.popular_hashtags))
+        popular_tags = rng.sample(self.popular_hashtags, num_popular)
         selected_hashtags.extend(popular_tags)
         
-        # 重複を削除し、最大数に制限
-        unique_hashtags = list(set(selected_hashtags))
+        # 重複を削除し（順序は保持）、最大数に制限
+        unique_hashtags = list(dict.fromkeys(selected_hashtags))
         if len(unique_hashtags) > max_tags:
-            unique_hashtags = random.sample(unique_hashtags, max_tags)
+            unique_hashtags = rng.sample(unique_hashtags, max_tags)
         
         return unique_hashtags
     
     def _detect_categories(self, text):
         """テキストからカテゴリーを推測する"""
-        # 各カテゴリーのキーワード
-        category_keywords = {
-            '料理': ['料理', 'レシピ', '食べ物', '調理', '美味しい', 'おいしい', '食材', '食事', 'クッキング', '味'],
-            '旅行': ['旅行', '観光', '旅', '景色', '絶景', '名所', '観光地', '海外', '国内', 'ツアー', '旅程'],
-            'ファッション': ['ファッション', '服', 'コーデ', 'スタイル', 'ブランド', 'アパレル', '着こなし', 'トレンド'],
-            'ビューティー': ['メイク', '化粧', 'コスメ', '美容', 'スキンケア', 'ヘアスタイル', 'ネイル', '肌'],
-            'エンタメ': ['映画', 'ドラマ', 'アニメ', '音楽', '漫画', 'ゲーム', 'エンタメ', '芸能', '俳優', '歌手'],
-            'スポーツ': ['スポーツ', '運動', 'トレーニング', '筋トレ', 'ワークアウト', 'ヨガ', 'ランニング', '健康'],
-            'ライフスタイル': ['暮らし', '生活', '日常', 'インテリア', '収納', '整理', '断捨離', 'シンプル'],
-            'ビジネス': ['ビジネス', '仕事', '起業', '副業', 'フリーランス', '在宅', 'リモート', '投資', '稼ぐ'],
-            '教育': ['勉強', '学習', '教育', '受験', '資格', '英語', 'プログラミング', '学校', '大学', '高校']
-        }
-        
         # テキストに含まれるキーワードからカテゴリーをスコアリング
         category_scores = {category: 0 for category in self.hashtag_dict.keys()}
         
-        for category, keywords in category_keywords.items():
-            for keyword in keywords:
-                if keyword in text:
+        for first_char, items in self._keyword_groups:
+            # 先頭の文字がなければ、その文字で始まるキーワードはすべて含まれない
+            if first_char not in text:
+                continue
+            for keyword, category in items:
+                if len(keyword) == 1 or keyword in text:
                     category_scores[category] += 1
         
         # スコアが高い順にカテゴリーをソート
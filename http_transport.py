@@ -0,0 +1,203 @@
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+
+# リトライ対象のHTTPステータス
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# サービスごとのリクエスト予算（回数, 秒）
+DEFAULT_BUDGETS = {
+    'pixabay': (100, 60),
+    'pexels': (200, 3600),
+    'unsplash': (50, 3600)
+}
+
+
+class RequestCancelled(Exception):
+    """キャンセルされたリクエスト"""
+
+
+def _check_cancel(cancel):
+    """キャンセルされていれば例外を送出する"""
+    if cancel is not None and cancel.is_set():
+        raise RequestCancelled("リクエストはキャンセルされました")
+
+
+class TokenBucket:
+    def __init__(self, requests_per_period, period):
+        """一定時間あたりのリクエスト数を制限するトークンバケットの初期化"""
+        self.capacity = max(1.0, float(requests_per_period))
+        self.rate = self.capacity / period  # 1秒あたりに補充されるトークン
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """経過時間に応じてトークンを補充する"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, cancel=None):
+        """トークンを1つ取得する（足りなければ補充されるまで待つ、cancelが立てば中断）"""
+        while True:
+            _check_cancel(cancel)
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            wait = min(wait, 5.0)
+            if cancel is not None:
+                # 待っている間にキャンセルされたらすぐに抜ける
+                cancel.wait(wait)
+            else:
+                time.sleep(wait)
+
+    def block_for(self, seconds):
+        """指定秒数のあいだリクエストを止める"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        """レスポンスのレート制限ヘッダーに合わせて残りのトークンを調整する"""
+        remaining = _header_number(headers, 'X-RateLimit-Remaining')
+        reset = _header_number(headers, 'X-RateLimit-Reset')
+        if remaining is None:
+            return
+
+        # Resetは「リセットまでの秒数」またはUNIX時刻のどちらか
+        reset_in = None
+        if reset is not None:
+            reset_in = reset - time.time() if reset > 1e9 else reset
+
+        with self._lock:
+            self.tokens = min(self.tokens, remaining)
+        if remaining <= 0 and reset_in:
+            self.block_for(max(0.0, reset_in))
+
+
+def _header_number(headers, name):
+    """数値のヘッダーを取得する（なければNone）"""
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class HttpTransport:
+    def __init__(self, connect_timeout=5, read_timeout=30, max_retries=3, backoff=0.5,
+                 max_backoff=30, pool_size=16, budgets=None):
+        """ホストごとの接続プール・タイムアウト・リトライ・レート制限を備えたHTTPクライアントの初期化"""
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+
+        # ホストごとのセッション（Keep-AliveでTLSハンドシェイクを再利用）
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+        # サービスごとのリクエスト予算
+        budgets = DEFAULT_BUDGETS if budgets is None else budgets
+        self.budgets = {name: TokenBucket(*budget) for name, budget in budgets.items()}
+
+    def session(self, url):
+        """URLのホストに対応するセッションを返す"""
+        # requestsは読み込みに時間がかかるため、最初のリクエスト時に読み込む
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # リトライはこのクラスで行うため、アダプター側では行わない
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount(host, adapter)
+                self._sessions[host] = session
+        return session
+
+    def _backoff_delay(self, attempt):
+        """指数バックオフ（フルジッター）の待ち時間を返す"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, provider=None, timeout=None, cancel=None, **kwargs):
+        """リトライ・レート制限付きでリクエストを送信する（cancelはthreading.Event、立つと予算の取得・再試行をやめる）"""
+        import requests
+
+        bucket = self.budgets.get(provider) if provider else None
+        session = self.session(url)
+        timeout = timeout if timeout else self.timeout
+
+        for attempt in range(self.max_retries + 1):
+            _check_cancel(cancel)
+            if bucket:
+                bucket.acquire(cancel)
+
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                self._sleep(self._backoff_delay(attempt), cancel)
+                continue
+
+            if bucket:
+                bucket.update_from_headers(response.headers)
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                # Retry-Afterがあればそれに従う
+                delay = _header_number(response.headers, 'Retry-After')
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                elif bucket and response.status_code == 429:
+                    bucket.block_for(delay)
+                response.close()
+                self._sleep(min(delay, self.max_backoff), cancel)
+                continue
+
+            return response
+
+        return response
+
+    def _sleep(self, seconds, cancel=None):
+        """再試行まで待つ（キャンセルされたら例外を送出）"""
+        if cancel is None:
+            time.sleep(seconds)
+            return
+        cancel.wait(seconds)
+        _check_cancel(cancel)
+
+    def get(self, url, **kwargs):
+        """GETリクエストを送信する"""
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        """すべてのセッションを閉じる"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_shared_transport = None
+_shared_lock = threading.Lock()
+
+
+def get_transport():
+    """プロセス内で共有するHttpTransportを返す"""
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = HttpTransport()
+        return _shared_transport
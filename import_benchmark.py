@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+# モジュールごとのインポート時間の上限（ミリ秒）
+DEFAULT_BUDGETS = {
+    'hashtag_generator': 50,
+    'media_search': 150,
+    'video_search': 150,
+    'tiktok_generator': 50
+}
+
+# インポート時に読み込まれてはいけない重いライブラリ
+HEAVY_MODULES = ['moviepy', 'numpy', 'imageio', 'PIL', 'requests', 'gtts', 'pixabay_python']
+
+# 子プロセスで実行するコード（インポート時間と読み込まれた重いライブラリを出力）
+_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{'seconds': elapsed, 'heavy': heavy}}))
+"""
+
+
+def measure_import(module, repeat=5):
+    """新しいプロセスでモジュールをインポートし、時間の中央値と読み込まれた重いライブラリを返す"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    heavy = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=root, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip().splitlines()[-1])
+        probe = json.loads(result.stdout.decode('utf-8').strip().splitlines()[-1])
+        samples.append(probe['seconds'] * 1000)
+        heavy = probe['heavy']
+
+    return {
+        'median_ms': round(statistics.median(samples), 2),
+        'min_ms': round(min(samples), 2),
+        'max_ms': round(max(samples), 2),
+        'heavy_modules': heavy
+    }
+
+
+def run_benchmarks(budgets, repeat=5):
+    """各モジュールのインポート時間を計測し、上限と比較した結果を返す"""
+    results = []
+    for module, budget_ms in budgets.items():
+        try:
+            result = measure_import(module, repeat)
+        except Exception as e:
+            result = {'error': f"{type(e).__name__}: {e}"}
+        result.update({'module': module, 'budget_ms': budget_ms})
+        result['ok'] = (
+            'error' not in result
+            and result['median_ms'] <= budget_ms
+            and not result['heavy_modules']
+        )
+        results.append(result)
+        print(f"{module}: {result.get('median_ms', 'error')} ms (上限 {budget_ms} ms)", file=sys.stderr)
+
+    return {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='検索・ハッシュタグ用モジュールのコールドインポート時間を計測する')
+    parser.add_argument('--output', default=None, help='結果のJSONを書き出すファイル（省略時は標準出力）')
+    parser.add_argument('--repeat', type=int, default=5, help='モジュールごとの計測回数')
+    parser.add_argument('--budget', action='append', default=None,
+                        help='モジュールと上限（ミリ秒）を「名前=ミリ秒」で指定（複数可、省略時は既定の上限）')
+    args = parser.parse_args(argv)
+
+    budgets = dict(DEFAULT_BUDGETS)
+    if args.budget:
+        budgets = {}
+        for item in args.budget:
+            module, _, budget_ms = item.partition('=')
+            budgets[module] = float(budget_ms) if budget_ms else DEFAULT_BUDGETS.get(module, 100)
+
+    report = run_benchmarks(budgets, repeat=args.repeat)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    # 上限を超えた、または重いライブラリが読み込まれたモジュールがあれば失敗
+    return 0 if all(result['ok'] for result in report['results']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
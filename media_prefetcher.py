@@ -0,0 +1,95 @@
+import os
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from download_manager import get_download_manager
+from video_search import select_rendition
+
+
+class MediaPrefetcher:
+    def __init__(self, download_dir="downloads", target_size=(1080, 1920), lookahead=1, max_workers=4, downloader=None):
+        """レンダリング中に次のシーンのメディアを先読みするクラスの初期化"""
+        self.download_dir = download_dir
+        os.makedirs(download_dir, exist_ok=True)
+
+        # レンディション選択に使う出力サイズと、何シーン先まで先読みするか
+        self.target_size = target_size
+        self.lookahead = lookahead
+
+        self.downloader = downloader if downloader else get_download_manager()
+        self.max_workers = max_workers
+        self._pool = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def media_url(self, item):
+        """メディア項目からダウンロードするURLを選ぶ（動画は画面サイズに合ったレンディション）"""
+        if item.get('renditions') or item.get('type') == 'video':
+            return select_rendition(item, *self.target_size)['url']
+        return item.get('url')
+
+    def _save_path(self, url, item):
+        """URLに対応する保存先のパスを返す"""
+        ext = os.path.splitext(urlsplit(url).path)[1].lower()
+        if not ext:
+            # Unsplashなど拡張子のないURLは項目の種類から決める（拡張子でメディアの種類を判定するため）
+            ext = '.mp4' if item.get('renditions') or item.get('type') == 'video' else '.jpg'
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.download_dir, name + ext)
+
+    def prefetch(self, items):
+        """ローカルにないメディアのダウンロードを開始する"""
+        for item in items:
+            if not isinstance(item, dict) or item.get('local_path'):
+                continue
+            url = self.media_url(item)
+            if not url:
+                continue
+            with self._lock:
+                if url in self._futures:
+                    continue
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='prefetch')
+                self._futures[url] = self._pool.submit(self.downloader.download, url, self._save_path(url, item))
+
+    def resolve(self, items):
+        """メディア項目をローカルのパスのリストにする（ダウンロード中なら完了を待つ、項目は変更しない）"""
+        self.prefetch(items)
+        paths = []
+        for item in items:
+            if not isinstance(item, dict):
+                paths.append(item)
+                continue
+            if item.get('local_path'):
+                paths.append(item['local_path'])
+                continue
+            url = self.media_url(item)
+            if not url:
+                continue
+            try:
+                path = self._futures[url].result()
+            except Exception as e:
+                print(f"メディアダウンロードエラー: {e}")
+                continue
+            # 同じURLはcloseまで完了済みのダウンロードを使い回す
+            paths.append(path)
+        return paths
+
+    def iter_resolved(self, specs):
+        """セグメント定義を順に返す（先のシーンのメディアを先読みしつつ、現在のシーンは解決済みのコピーにする）"""
+        for i, spec in enumerate(specs):
+            for ahead in specs[i + 1:i + 1 + self.lookahead]:
+                self.prefetch(ahead.get('media_paths', []))
+            if spec.get('media_paths'):
+                spec = dict(spec, media_paths=self.resolve(spec['media_paths']))
+            yield spec
+
+    def close(self):
+        """ダウンロードの完了を待って終了する"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._futures.clear()
+        if pool is not None:
+            pool.shutdown(wait=True)
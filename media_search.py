@@ -1,17 +1,24 @@
 import os
-import requests
 import json
 import time
 import random
-from dotenv import load_dotenv
-import pixabay_python as pxb
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+import threading
+from http_transport import get_transport, RequestCancelled
+from search_cache import get_search_cache
+from download_manager import get_download_manager
 
-# .envファイルから環境変数を読み込む
-load_dotenv()
 
 class MediaSearch:
-    def __init__(self):
-        """メディア検索クラスの初期化"""
+    # キャッシュキーに使う画像の向き（各サービスとも縦長で検索）
+    orientation = 'portrait'
+    
+    def __init__(self, cache=None):
+        """メディア検索クラスの初期化（cacheはSearchCache、Noneなら共有キャッシュ、Falseで無効）"""
+        # .envファイルから環境変数を読み込む（インポート時ではなく初期化時に行う）
+        from dotenv import load_dotenv
+        load_dotenv()
+        
         # APIキーの取得
         self.pixabay_api_key = os.getenv('PIXABAY_API_KEY', '')
         self.pexels_api_key = os.getenv('PEXELS_API_KEY', '')
@@ -20,32 +27,54 @@ class MediaSearch:
         # 検索サービスの設定
         self.search_services = ['pixabay', 'pexels', 'unsplash']
         
-    def search_images(self, keyword, max_results=10):
-        """キーワードに基づいて画像を検索する"""
-        results = []
+        # APIのエンドポイント（テスト用のローカルサーバーに差し替え可能）
+        self.endpoints = {
+            'pixabay': os.getenv('PIXABAY_API_URL', 'https://pixabay.com/api/'),
+            'pexels': os.getenv('PEXELS_API_URL', 'https://api.pexels.com/v1/search'),
+            'unsplash': os.getenv('UNSPLASH_API_URL', 'https://api.unsplash.com/search/photos')
+        }
+        
+        # 1リクエストあたりの制限時間（秒）
+        self.request_timeout = 10
+        
+        # 接続プール・リトライ・レート制限を共有するHTTPクライアント
+        self.transport = get_transport()
+        
+        # 検索結果の永続キャッシュ
+        self.cache = get_search_cache() if cache is None else cache
         
+        # ダウンロードは共有の保存先で重複を避ける
+        self.downloader = get_download_manager()
+        
+    def _configured_services(self):
+        """APIキーが設定されている検索サービスと検索関数の一覧を返す"""
+        providers = {
+            'pixabay': (self.pixabay_api_key, self._search_pixabay),
+            'pexels': (self.pexels_api_key, self._search_pexels),
+            'unsplash': (self.unsplash_access_key, self._search_unsplash)
+        }
+        return [
+            (service, providers[service][1])
+            for service in self.search_services
+            if service in providers and providers[service][0]
+        ]
+    
+    def search_images(self, keyword, max_results=10, concurrent=False, deadline=None):
+        """キーワードに基づいて画像を検索する"""
         # 検索サービスをランダムに選択
         random.shuffle(self.search_services)
         
-        # 各サービスで検索
-        for service in self.search_services:
+        # 並列モードでは全サービスに同時に問い合わせる
+        if concurrent:
+            return self._search_concurrent(keyword, max_results, deadline)
+        
+        results = []
+        
+        # 各サービスで検索（不足している件数だけを問い合わせる）
+        for service, search in self._configured_services():
             if len(results) >= max_results:
                 break
-                
-            if service == 'pixabay' and self.pixabay_api_key:
-                # Pixabayで検索
-                pixabay_results = self._search_pixabay(keyword, max_results)
-                results.extend(pixabay_results)
-            
-            elif service == 'pexels' and self.pexels_api_key:
-                # Pexelsで検索
-                pexels_results = self._search_pexels(keyword, max_results)
-                results.extend(pexels_results)
-            
-            elif service == 'unsplash' and self.unsplash_access_key:
-                # Unsplashで検索
-                unsplash_results = self._search_unsplash(keyword, max_results)
-                results.extend(unsplash_results)
+            results.extend(self._cached_search(service, search, keyword, max_results - len(results)))
         
         # 結果が最大数を超える場合はカット
         if len(results) > max_results:
@@ -53,22 +82,67 @@ class MediaSearch:
             
         return results
     
-    def _search_pixabay(self, keyword, max_results=10):
+    def _search_concurrent(self, keyword, max_results=10, deadline=None):
+        """全サービスに並列で問い合わせ、件数が揃った時点で残りを打ち切る"""
+        services = self._configured_services()
+        if not services:
+            return []
+        
+        deadline = deadline if deadline else self.request_timeout
+        results = []
+        # 打ち切り後は、実行中の問い合わせも予算の取得・再試行をせずに終了させる
+        cancel = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=len(services))
+        try:
+            futures = {
+                pool.submit(self._cached_search, service, search, keyword, max_results, deadline, cancel): service
+                for service, search in services
+            }
+            for future in as_completed(futures, timeout=deadline):
+                results.extend(future.result())
+                if len(results) >= max_results:
+                    break
+        except FutureTimeoutError:
+            print(f"検索タイムアウト: {deadline}秒以内に応答のないサービスを打ち切りました")
+        finally:
+            # 未完了の問い合わせは待たずにキャンセルする（送信済みのリクエストは応答かタイムアウトまで続く）
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        return results[:max_results]
+    
+    def _cached_search(self, service, search, keyword, max_results, timeout=None, cancel=None):
+        """キャッシュを経由して1つのサービスで検索する"""
+        if not self.cache:
+            return search(keyword, max_results, timeout=timeout, cancel=cancel)
+        return self.cache.fetch(
+            service, keyword, self.orientation, max_results,
+            lambda: search(keyword, max_results, timeout=timeout, cancel=cancel),
+            # 裏での更新は呼び出しが終わった後も続くため、この呼び出しの締め切り・キャンセルを使わない
+            refresh_fetcher=lambda: search(keyword, max_results)
+        )
+    
+    def _search_pixabay(self, keyword, max_results=10, timeout=None, cancel=None):
         """Pixabay APIを使用して画像を検索する"""
         results = []
         
         try:
-            # Pixabay APIクライアントの初期化
-            pixabay_api = pxb.Pixabay(self.pixabay_api_key)
-            
-            # 画像検索
-            response = pixabay_api.image_search(
-                q=keyword,
-                lang='ja',
-                image_type='photo',
-                orientation='vertical',  # TikTok向けに縦長画像
-                per_page=max_results
-            )
+            # 画像検索（共有の接続プールを使ってREST APIを直接呼び出す）
+            params = {
+                'key': self.pixabay_api_key,
+                'q': keyword,
+                'lang': 'ja',
+                'image_type': 'photo',
+                'orientation': 'vertical',  # TikTok向けに縦長画像
+                'per_page': max(3, max_results)  # Pixabayは3件以上を指定する必要がある
+            }
+            response = self.transport.get(
+                self.endpoints['pixabay'],
+                params=params,
+                provider='pixabay',
+                timeout=timeout or self.request_timeout,
+                cancel=cancel
+            ).json()
             
             # 結果の処理
             if 'hits' in response:
@@ -82,18 +156,22 @@ class MediaSearch:
                         'source_url': hit['pageURL']
                     }
                     results.append(result)
+        except RequestCancelled:
+            # 他のサービスで件数が揃った・時間切れで打ち切られた
+            pass
         except Exception as e:
             print(f"Pixabay検索エラー: {e}")
         
         return results
     
-    def _search_pexels(self, keyword, max_results=10):
+    def _search_pexels(self, keyword, max_results=10, timeout=None, cancel=None):
         """Pexels APIを使用して画像を検索する"""
         results = []
         
         try:
             # Pexels API URLの設定
-            url = f"https://api.pexels.com/v1/search?query={keyword}&per_page={max_results}&orientation=portrait"
+            url = self.endpoints['pexels']
+            params = {'query': keyword, 'per_page': max_results, 'orientation': 'portrait'}
             
             # ヘッダーの設定
             headers = {
@@ -101,7 +179,7 @@ class MediaSearch:
             }
             
             # リクエストの送信
-            response = requests.get(url, headers=headers) 
+            response = self.transport.get(url, params=params, headers=headers, provider='pexels', timeout=timeout or self.request_timeout, cancel=cancel)
             data = response.json()
             
             # 結果の処理
@@ -116,18 +194,22 @@ class MediaSearch:
                         'source_url': photo['url']
                     }
                     results.append(result)
+        except RequestCancelled:
+            # 他のサービスで件数が揃った・時間切れで打ち切られた
+            pass
         except Exception as e:
             print(f"Pexels検索エラー: {e}")
         
         return results
     
-    def _search_unsplash(self, keyword, max_results=10):
+    def _search_unsplash(self, keyword, max_results=10, timeout=None, cancel=None):
         """Unsplash APIを使用して画像を検索する"""
         results = []
         
         try:
             # Unsplash API URLの設定
-            url = f"https://api.unsplash.com/search/photos?query={keyword}&per_page={max_results}&orientation=portrait"
+            url = self.endpoints['unsplash']
+            params = {'query': keyword, 'per_page': max_results, 'orientation': 'portrait'}
             
             # ヘッダーの設定
             headers = {
@@ -135,7 +217,7 @@ class MediaSearch:
             }
             
             # リクエストの送信
-            response = requests.get(url, headers=headers) 
+            response = self.transport.get(url, params=params, headers=headers, provider='unsplash', timeout=timeout or self.request_timeout, cancel=cancel)
             data = response.json()
             
             # 結果の処理
@@ -150,6 +232,9 @@ class MediaSearch:
                         'source_url': photo['links']['html']
                     }
                     results.append(result)
+        except RequestCancelled:
+            # 他のサービスで件数が揃った・時間切れで打ち切られた
+            pass
         except Exception as e:
             print(f"Unsplash検索エラー: {e}")
         
@@ -158,13 +243,12 @@ class MediaSearch:
     def download_media(self, url, filename):
         """URLから画像をダウンロードして保存する"""
         try:
-            response = requests.get(url, stream=True)
-            if response.status_code == 200:
-                with open(filename, 'wb') as f:
-                    for chunk in response.iter_content(1024):
-                        f.write(chunk)
-                return filename
+            return self.downloader.download(url, filename)
         except Exception as e:
             print(f"メディアダウンロードエラー: {e}")
         
         return None
+    
+    def download_media_batch(self, items, max_workers=None):
+        """(URL, 保存先)のリストを並列でダウンロードする（失敗したものはNone）"""
+        return self.downloader.download_many(items, max_workers)
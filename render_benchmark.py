@@ -0,0 +1,401 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from ffmpeg_utils import run_ffmpeg
+
+# 合成画像の縦横サイズ（横長・正方形・縦長など）
+IMAGE_SIZES = {
+    'landscape_16x9': (1920, 1080),
+    'square': (1200, 1200),
+    'portrait_9x16': (1080, 1920),
+    'portrait_3x4': (900, 1200),
+    'tall': (800, 2400)
+}
+
+# 合成動画の設定（サイズ, 長さ秒）
+VIDEO_SPECS = {
+    'landscape_720p_2s': ((1280, 720), 2),
+    'portrait_720p_4s': ((720, 1280), 4),
+    'landscape_1080p_6s': ((1920, 1080), 6)
+}
+
+# moviepy版とffmpeg版の出力を比較するときのPSNRの下限（dB）
+# 3シーンでの実測値（平均/最小）: 通常 47.3/39.9 dB、--draft 49.8/34.6 dB
+PSNR_FLOOR = {
+    'mean_psnr': 45.0,
+    'min_psnr': 32.0
+}
+
+
+def make_synthetic_media(media_dir):
+    """ベンチマーク用の画像・動画・音声をローカルに生成する"""
+    os.makedirs(media_dir, exist_ok=True)
+    rng = np.random.default_rng(0)
+    media = {'images': {}, 'videos': {}, 'audio': {}}
+
+    # グラデーションとノイズの画像
+    for name, (width, height) in IMAGE_SIZES.items():
+        x = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None, None]
+        noise = rng.integers(0, 32, (height, width, 3)).astype(np.float32)
+        frame = np.concatenate([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2) + noise
+        path = os.path.join(media_dir, f"{name}.jpg")
+        Image.fromarray(np.clip(frame, 0, 255).astype(np.uint8)).save(path, quality=90)
+        media['images'][name] = path
+
+    # テストパターンの動画（音声付き）
+    for name, ((width, height), duration) in VIDEO_SPECS.items():
+        path = os.path.join(media_dir, f"{name}.mp4")
+        run_ffmpeg([
+            '-f', 'lavfi', '-i', f'testsrc=size={width}x{height}:rate=30:duration={duration}',
+            '-f', 'lavfi', '-i', f'sine=frequency=330:duration={duration}',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-shortest', path
+        ])
+        media['videos'][name] = path
+
+    # ナレーション・BGM用の音声
+    for name, (frequency, duration) in {'narration': (440, 4), 'bgm': (220, 7)}.items():
+        path = os.path.join(media_dir, f"{name}.mp3")
+        run_ffmpeg(['-f', 'lavfi', '-i', f'sine=frequency={frequency}:duration={duration}', path])
+        media['audio'][name] = path
+
+    return media
+
+
+def make_script(n_scenes, media):
+    """n_scenesシーンの台本とメディア割り当てを作成する"""
+    image_paths = list(media['images'].values())
+    video_paths = list(media['videos'].values())
+
+    scenes, media_dict, audio_dict = {}, {}, {}
+    for i in range(n_scenes):
+        scene_id = f"scene_{i + 1}"
+        scenes[scene_id] = {'text': f"シーン{i + 1}：ベンチマーク用のテキストです。" * (1 + i % 3)}
+        # 画像・動画・画像+動画を順番に割り当てる
+        if i % 3 == 0:
+            paths = [image_paths[i % len(image_paths)]]
+        elif i % 3 == 1:
+            paths = [video_paths[i % len(video_paths)]]
+        else:
+            paths = [image_paths[(i + 1) % len(image_paths)], video_paths[i % len(video_paths)]]
+        media_dict[scene_id] = [{'local_path': path} for path in paths]
+        audio_dict[scene_id] = media['audio']['narration']
+
+    return scenes, media_dict, audio_dict
+
+
+def _peak_rss_mb():
+    """このプロセスと子プロセスのピークRSS（MB）を返す"""
+    # Linuxではru_maxrssはKB単位、macOSではバイト単位
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / divisor, 1), round(children / divisor, 1)
+
+
+def _render_frames(clip, fps):
+    """クリップの全フレームを生成し、フレーム数を返す"""
+    n_frames = 0
+    for _ in clip.iter_frames(fps=fps, dtype='uint8'):
+        n_frames += 1
+    return n_frames
+
+
+def _run_case(case, work_dir, media, settings):
+    """1つのベンチマークケースを実行する（ピークRSS計測のため別プロセスで呼ぶ）"""
+    from video_generator import VideoGenerator
+
+    generator = VideoGenerator(output_dir=os.path.join(work_dir, 'output'), cache_dir=os.path.join(work_dir, case['cache']))
+    if settings.get('draft'):
+        generator.set_draft_mode()
+    if settings.get('encoding_profile'):
+        generator.set_encoding_profile(settings['encoding_profile'])
+
+    fps = generator.fps
+    kind = case['kind']
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    if kind == 'text':
+        clip = generator.create_text_clip(case['text'], duration=case['duration'], bg_color=(0, 0, 0, 128))
+        n_frames = _render_frames(clip, fps)
+    elif kind == 'image':
+        clip = generator.create_image_clip(media['images'][case['media']], duration=case['duration'], zoom=case['zoom'])
+        n_frames = _render_frames(clip, fps)
+    elif kind == 'video':
+        clip = generator.create_video_clip(media['videos'][case['media']], duration=case['duration'])
+        n_frames = _render_frames(clip, fps)
+    elif kind == 'scene':
+        scenes, media_dict, audio_dict = make_script(case['index'] + 1, media)
+        scene_id = list(scenes)[-1]
+        media_paths = [item['local_path'] for item in media_dict[scene_id]]
+        clip = generator.create_scene_clip(scenes[scene_id]['text'], media_paths, case['duration'], audio_path=audio_dict[scene_id])
+        n_frames = _render_frames(clip, fps)
+    elif kind == 'generate_video':
+        scenes, media_dict, audio_dict = make_script(case['n_scenes'], media)
+        output_path = generator.generate_video(
+            scenes,
+            media_dict,
+            output_filename=f"bench_{case['name']}.mp4",
+            bgm_path=media['audio']['bgm'],
+            audio_dict=audio_dict,
+            parallel=settings.get('parallel', False),
+            segment_cache=settings.get('segment_cache', False),
+            streaming=settings.get('streaming', False),
+            backend=settings.get('backend', 'moviepy')
+        )
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        n_frames = ffmpeg_parse_infos(output_path).get('video_nframes', 0)
+    else:
+        raise ValueError(f"不明なベンチマーク: {kind}")
+
+    generator.release_clips()
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start
+    peak_rss, peak_rss_children = _peak_rss_mb()
+
+    return {
+        'name': case['name'],
+        'kind': kind,
+        'wall_time': round(wall_time, 4),
+        'cpu_time': round(cpu_time, 4),
+        'frames': n_frames,
+        'frames_per_second': round(n_frames / wall_time, 2) if n_frames and wall_time > 0 else None,
+        'peak_rss_mb': peak_rss,
+        'peak_rss_children_mb': peak_rss_children
+    }
+
+
+def _render_backend(backend, work_dir, media, n_scenes, settings):
+    """同じ台本を指定のバックエンドで書き出し、出力のパスを返す（別プロセスで呼ぶ）"""
+    from video_generator import VideoGenerator
+
+    generator = VideoGenerator(output_dir=os.path.join(work_dir, f"output_{backend}"), cache_dir=os.path.join(work_dir, f"cache_{backend}"))
+    if settings.get('draft'):
+        generator.set_draft_mode()
+    if settings.get('encoding_profile'):
+        generator.set_encoding_profile(settings['encoding_profile'])
+
+    scenes, media_dict, audio_dict = make_script(n_scenes, media)
+    return generator.generate_video(
+        scenes,
+        media_dict,
+        output_filename=f"compare_{backend}.mp4",
+        bgm_path=media['audio']['bgm'],
+        audio_dict=audio_dict,
+        backend=backend
+    )
+
+
+def compare_backends(n_scenes=3, settings=None, work_dir=None, floor=None):
+    """同じ合成データをmoviepy版とffmpeg版で書き出し、PSNRが下限以上かを確認した結果を返す"""
+    from ffmpeg_backend import compare_videos
+
+    settings = settings or {}
+    floor = dict(floor or PSNR_FLOOR)
+    keep_work_dir = work_dir is not None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='backend_compare_')
+
+    try:
+        media = make_synthetic_media(os.path.join(work_dir, 'media'))
+        outputs = {}
+        for backend in ('moviepy', 'ffmpeg'):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                outputs[backend] = pool.submit(_render_backend, backend, work_dir, media, n_scenes, settings).result()
+        metrics = compare_videos(outputs['moviepy'], outputs['ffmpeg'])
+    finally:
+        if not keep_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    failures = [name for name, minimum in floor.items() if metrics[name] < minimum]
+    for name, minimum in floor.items():
+        print(f"{name}: {metrics[name]:.2f} dB (下限 {minimum} dB)", file=sys.stderr)
+
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'n_scenes': n_scenes,
+            'settings': settings
+        },
+        'floor': floor,
+        'metrics': metrics,
+        'ok': not failures,
+        'failures': failures
+    }
+
+
+def build_cases(scene_counts, quick=False):
+    """ベンチマークケースの一覧を作成する"""
+    duration = 2 if quick else 5
+    cases = []
+
+    # テキスト（1回目は描画、2回目はキャッシュから）
+    for cache_state in ('cold', 'warm'):
+        cases.append({
+            'name': f"create_text_clip_{cache_state}",
+            'kind': 'text',
+            'text': "ベンチマーク用のテキストです。\n#ハッシュタグ #テスト",
+            'duration': duration,
+            'cache': 'cache_text'
+        })
+
+    for name in IMAGE_SIZES:
+        for zoom in (False, True):
+            cases.append({
+                'name': f"create_image_clip_{name}{'_zoom' if zoom else ''}",
+                'kind': 'image',
+                'media': name,
+                'zoom': zoom,
+                'duration': duration,
+                'cache': f"cache_{name}"
+            })
+
+    for name in VIDEO_SPECS:
+        cases.append({
+            'name': f"create_video_clip_{name}",
+            'kind': 'video',
+            'media': name,
+            'duration': duration,
+            'cache': f"cache_{name}"
+        })
+
+    for index in range(3):
+        cases.append({
+            'name': f"create_scene_clip_{index}",
+            'kind': 'scene',
+            'index': index,
+            'duration': duration,
+            'cache': f"cache_scene_{index}"
+        })
+
+    for n_scenes in scene_counts:
+        cases.append({
+            'name': f"generate_video_{n_scenes}_scenes",
+            'kind': 'generate_video',
+            'n_scenes': n_scenes,
+            'cache': f"cache_video_{n_scenes}"
+        })
+
+    return cases
+
+
+def _git_revision():
+    """現在のコミットを返す（取得できない場合はNone）"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.decode().strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmarks(scene_counts=(1, 5, 20), quick=False, settings=None, work_dir=None, only=None):
+    """ベンチマークを実行し、結果の辞書を返す"""
+    settings = settings or {}
+    keep_work_dir = work_dir is not None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='render_bench_')
+
+    try:
+        media = make_synthetic_media(os.path.join(work_dir, 'media'))
+        cases = build_cases(scene_counts, quick=quick)
+        if only:
+            cases = [case for case in cases if any(pattern in case['name'] for pattern in only)]
+
+        results = []
+        for case in cases:
+            # ケースごとに新しいプロセスで実行してピークRSSを分離する
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                try:
+                    result = pool.submit(_run_case, case, work_dir, media, settings).result()
+                except Exception as e:
+                    result = {'name': case['name'], 'kind': case['kind'], 'error': f"{type(e).__name__}: {e}"}
+            results.append(result)
+            print(f"{result['name']}: {result.get('wall_time', 'error')}", file=sys.stderr)
+    finally:
+        if not keep_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': quick,
+            'settings': settings
+        },
+        'results': results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='VideoGeneratorのレンダリング性能を合成データで計測する')
+    parser.add_argument('--output', default=None, help='結果のJSONを書き出すファイル（省略時は標準出力）')
+    parser.add_argument('--scenes', default='1,5,20', help='generate_videoで計測するシーン数（カンマ区切り）')
+    parser.add_argument('--quick', action='store_true', help='短いクリップで素早く計測する')
+    parser.add_argument('--only', action='append', default=None, help='名前にこの文字列を含むケースだけを実行')
+    parser.add_argument('--draft', action='store_true', help='下書きモードで計測する')
+    parser.add_argument('--parallel', action='store_true', help='generate_videoを並列モードで計測する')
+    parser.add_argument('--segment-cache', action='store_true', help='generate_videoでセグメントキャッシュを使う')
+    parser.add_argument('--streaming', action='store_true', help='generate_videoをストリーミングモードで計測する')
+    parser.add_argument('--backend', default='moviepy', choices=['moviepy', 'ffmpeg'], help='generate_videoのレンダリングバックエンド')
+    parser.add_argument('--profile', default=None, help='エンコードプロファイル')
+    parser.add_argument('--work-dir', default=None, help='作業ディレクトリ（指定すると削除しない）')
+    parser.add_argument('--compare-backends', action='store_true',
+                        help='性能計測の代わりに、同じ台本をmoviepy版とffmpeg版で書き出してPSNRを比較する')
+    parser.add_argument('--compare-scenes', type=int, default=3, help='バックエンド比較に使うシーン数')
+    parser.add_argument('--min-mean-psnr', type=float, default=PSNR_FLOOR['mean_psnr'], help='バックエンド比較の平均PSNRの下限（dB）')
+    parser.add_argument('--min-psnr', type=float, default=PSNR_FLOOR['min_psnr'], help='バックエンド比較の最小PSNRの下限（dB）')
+    args = parser.parse_args(argv)
+
+    settings = {
+        'draft': args.draft,
+        'parallel': args.parallel,
+        'segment_cache': args.segment_cache,
+        'streaming': args.streaming,
+        'backend': args.backend,
+        'encoding_profile': args.profile
+    }
+    if args.compare_backends:
+        del settings['backend']
+        report = compare_backends(
+            n_scenes=args.compare_scenes,
+            settings=settings,
+            work_dir=args.work_dir,
+            floor={'mean_psnr': args.min_mean_psnr, 'min_psnr': args.min_psnr}
+        )
+        failed = not report['ok']
+    else:
+        scene_counts = [int(n) for n in args.scenes.split(',') if n.strip()]
+        report = run_benchmarks(scene_counts, quick=args.quick, settings=settings, work_dir=args.work_dir, only=args.only)
+        failed = any('error' in result for result in report['results'])
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ファイル内容ハッシュのメモ（パス・サイズ・更新時刻 -> ハッシュ）
+_digest_memo = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """ファイル内容のSHA-256を返す（変更がなければ再計算しない）"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        digest = _digest_memo.get(memo_key)
+    if digest:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+class RasterCache:
+    def __init__(self, cache_dir, max_items=64):
+        """メモリLRUとディスクの2段構成のラスターキャッシュの初期化"""
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # メモリ上のLRU（キー -> ndarray）
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 統計情報
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts):
+        """キャッシュキー（内容のハッシュ）を作成する"""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        """キーに対応するディスク上のパスを返す"""
+        return os.path.join(self.cache_dir, key[:2], key + '.npy')
+
+    def _remember(self, key, array):
+        """メモリLRUに登録する"""
+        with self._lock:
+            self._memory[key] = array
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """キャッシュから取得する（なければNone）"""
+        with self._lock:
+            array = self._memory.get(key)
+            if array is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return array
+
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                array = np.load(path)
+                array.flags.writeable = False
+                self.disk_hits += 1
+                self._remember(key, array)
+                return array
+            except Exception as e:
+                print(f"キャッシュ読み込みエラー: {e}")
+
+        return None
+
+    def put(self, key, array):
+        """キャッシュに保存する"""
+        array = np.ascontiguousarray(array)
+        array.flags.writeable = False
+        self._remember(key, array)
+
+        # 一時ファイルに書いてから置き換え（並列プロセスでも壊れないように）
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            fd, temp_path = tempfile.mkstemp(suffix='.npy', dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"キャッシュ書き込みエラー: {e}")
+
+        return array
+
+    def get_or_create(self, key, factory):
+        """キャッシュになければfactoryで作成して保存する"""
+        array = self.get(key)
+        if array is None:
+            self.misses += 1
+            array = self.put(key, factory())
+        return array
+
+    def clear_memory(self):
+        """メモリ上のキャッシュを破棄する"""
+        with self._lock:
+            self._memory.clear()
+
+
+class SegmentCache:
+    def __init__(self, cache_dir):
+        """エンコード済みセグメントのキャッシュの初期化"""
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # 統計情報
+        self.hits = 0
+        self.misses = 0
+
+    make_key = staticmethod(RasterCache.make_key)
+
+    def path(self, key):
+        """キーに対応するセグメントファイルのパスを返す"""
+        return os.path.join(self.cache_dir, key[:2], key + '.mp4')
+
+    def contains(self, path):
+        """セグメントがキャッシュ済みかどうかを返す"""
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
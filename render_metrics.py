@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+# すべてのプロファイラーの終了時に呼ばれるフック（ジョブランナーなどが登録する）
+_global_hooks = []
+
+
+def add_global_hook(callback):
+    """すべてのレンダリングの計測結果を受け取るフックを登録する"""
+    _global_hooks.append(callback)
+    return callback
+
+
+def remove_global_hook(callback):
+    """登録したフックを解除する"""
+    if callback in _global_hooks:
+        _global_hooks.remove(callback)
+
+
+def maybe_stage(profiler, name, **labels):
+    """プロファイラーがあれば計測し、なければ何もしないコンテキストを返す"""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name, **labels)
+
+
+def _label_key(labels):
+    """ラベルを集計用のキーに変換する"""
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+class RenderProfiler:
+    def __init__(self, name='render'):
+        """レンダリングの段階ごとの時間を計測するクラスの初期化"""
+        self.name = name
+        self.hooks = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+        # 段階ごとの計測（1回ごとのイベント）
+        self.events = []
+        # フレーム生成の集計（名前・ラベル -> 回数・時間）
+        self.frame_stats = {}
+
+    def add_hook(self, callback):
+        """計測終了時に結果を受け取るフックを登録する"""
+        self.hooks.append(callback)
+        return callback
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """with文の区間の経過時間とCPU時間を記録する"""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            event = {
+                'name': name,
+                'labels': labels,
+                # clockはperf_counterの値そのもの（プロセス間で共通の単調時計）
+                'clock': wall_start,
+                'start': wall_start - self._origin,
+                'wall': time.perf_counter() - wall_start,
+                'cpu': time.process_time() - cpu_start,
+                'pid': os.getpid(),
+                'thread': threading.get_ident()
+            }
+            if error:
+                event['error'] = error
+            with self._lock:
+                self.events.append(event)
+
+    def record_frame(self, name, wall, cpu, **labels):
+        """フレーム生成1回分の時間を集計する"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            stats = self.frame_stats.get(key)
+            if stats is None:
+                stats = self.frame_stats[key] = {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'max_wall': 0.0}
+            stats['count'] += 1
+            stats['wall'] += wall
+            stats['cpu'] += cpu
+            stats['max_wall'] = max(stats['max_wall'], wall)
+
+    def wrap_clip(self, clip, name, **labels):
+        """クリップのフレーム生成（get_frame）ごとの時間を計測するクリップを返す"""
+        if clip is None:
+            return None
+
+        def timed_frame(get_frame, t):
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            frame = get_frame(t)
+            self.record_frame(name, time.perf_counter() - wall_start, time.thread_time() - cpu_start, **labels)
+            return frame
+
+        return clip.fl(timed_frame)
+
+    def merge(self, report):
+        """別プロセスで計測した結果を取り込む"""
+        # 開始時刻はワーカー側のプロファイラー基準なので、このプロファイラー基準に直す
+        stages = [
+            dict(event, start=event['clock'] - self._origin) if 'clock' in event else dict(event)
+            for event in report.get('stages', [])
+        ]
+        with self._lock:
+            self.events.extend(stages)
+            for item in report.get('frames', []):
+                key = (item['name'], _label_key(item['labels']))
+                stats = self.frame_stats.setdefault(key, {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'max_wall': 0.0})
+                stats['count'] += item['count']
+                stats['wall'] += item['wall']
+                stats['cpu'] += item['cpu']
+                stats['max_wall'] = max(stats['max_wall'], item['max_wall'])
+
+    def report(self):
+        """計測結果を辞書で返す"""
+        with self._lock:
+            stages = [dict(event) for event in self.events]
+            frames = [
+                dict(stats, name=name, labels=dict(labels))
+                for (name, labels), stats in self.frame_stats.items()
+            ]
+
+        # 段階ごとの合計
+        totals = {}
+        for event in stages:
+            total = totals.setdefault(event['name'], {'count': 0, 'wall': 0.0, 'cpu': 0.0})
+            total['count'] += 1
+            total['wall'] += event['wall']
+            total['cpu'] += event['cpu']
+
+        return {'name': self.name, 'stages': stages, 'frames': frames, 'totals': totals}
+
+    def finish(self, **meta):
+        """計測を終了し、フックに結果を渡す"""
+        report = self.report()
+        report['meta'] = meta
+        for callback in self.hooks + _global_hooks:
+            try:
+                callback(report)
+            except Exception as e:
+                print(f"計測フックエラー: {e}")
+        return report
+
+    def to_trace(self):
+        """Chromeトレース形式（chrome://tracing, Perfetto）のイベント一覧を返す"""
+        events = []
+        for event in self.report()['stages']:
+            events.append({
+                'name': event['name'],
+                'ph': 'X',
+                'ts': round((event['clock'] - self._origin if 'clock' in event else event['start']) * 1e6, 1),
+                'dur': round(event['wall'] * 1e6, 1),
+                'pid': event.get('pid', 0),
+                'tid': event.get('thread', 0),
+                'args': dict(event['labels'], cpu=event['cpu'])
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path):
+        """JSONトレースをファイルに書き出す"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_trace(), f, ensure_ascii=False)
+        return path
+
+    def to_prometheus(self, prefix='tiktok_render'):
+        """Prometheusのテキスト形式でカウンターを返す"""
+        def fmt_labels(labels):
+            if not labels:
+                return ''
+            escaped = [
+                '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                for k, v in sorted(labels.items())
+            ]
+            return '{' + ','.join(escaped) + '}'
+
+        report = self.report()
+        stage_totals = {}
+        for event in report['stages']:
+            key = (event['name'], _label_key(event['labels']))
+            total = stage_totals.setdefault(key, [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += event['wall']
+            total[2] += event['cpu']
+
+        metrics = [
+            ('stage_calls_total', 'Number of times each render stage ran', 0, stage_totals),
+            ('stage_wall_seconds_total', 'Wall-clock seconds spent in each render stage', 1, stage_totals),
+            ('stage_cpu_seconds_total', 'CPU seconds spent in each render stage', 2, stage_totals)
+        ]
+        frame_totals = {
+            (item['name'], _label_key(item['labels'])): [item['count'], item['wall'], item['cpu']]
+            for item in report['frames']
+        }
+        metrics += [
+            ('frame_calls_total', 'Number of frame generation calls', 0, frame_totals),
+            ('frame_wall_seconds_total', 'Wall-clock seconds spent generating frames', 1, frame_totals),
+            ('frame_cpu_seconds_total', 'CPU seconds spent generating frames', 2, frame_totals)
+        ]
+
+        lines = []
+        for metric, help_text, index, totals in metrics:
+            name = f"{prefix}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (stage, labels), values in sorted(totals.items()):
+                all_labels = dict(labels, stage=stage)
+                lines.append(f"{name}{fmt_labels(all_labels)} {values[index]:.6g}")
+        return '\n'.join(lines) + '\n'
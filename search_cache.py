@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 既定のキャッシュファイル（環境変数で変更可能）
+DEFAULT_CACHE_PATH = os.path.join('cache', 'search_cache.sqlite3')
+
+
+class SearchCache:
+    def __init__(self, path=None, ttl=24 * 3600, max_entries=2000, stale_while_revalidate=False,
+                 refresh_workers=2):
+        """検索結果を保存する永続キャッシュ（SQLite, 有効期限・件数上限付き）の初期化"""
+        self.path = path if path else os.getenv('SEARCH_CACHE_PATH', DEFAULT_CACHE_PATH)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # 期限切れでも古い結果をすぐに返し、裏で更新するモード
+        self.stale_while_revalidate = stale_while_revalidate
+
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        # 複数スレッドから使うため、1つの接続をロックで保護する
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS search_results ('
+            ' key TEXT PRIMARY KEY,'
+            ' provider TEXT, keyword TEXT, orientation TEXT, per_page INTEGER,'
+            ' payload TEXT, created REAL, accessed REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_accessed ON search_results (accessed)')
+        self._conn.commit()
+
+        # バックグラウンド更新（同じキーの更新は同時に1つだけ）
+        self._refresh_workers = refresh_workers
+        self._refresh_pool = None
+        self._refreshing = set()
+
+        # 統計
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def make_key(provider, keyword, orientation, per_page):
+        """検索条件からキャッシュキーを作成する"""
+        payload = json.dumps([provider, keyword.strip(), orientation, int(per_page)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, provider, keyword, orientation, per_page):
+        """キャッシュされた結果と、有効期限内かどうかを返す（なければNone）"""
+        key = self.make_key(provider, keyword, orientation, per_page)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT payload, created FROM search_results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            # LRU用に最終アクセス時刻を更新
+            self._conn.execute('UPDATE search_results SET accessed = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+        payload, created = row
+        return json.loads(payload), now - created < self.ttl
+
+    def put(self, provider, keyword, orientation, per_page, results):
+        """検索結果を保存し、上限を超えた分は古い順に削除する"""
+        key = self.make_key(provider, keyword, orientation, per_page)
+        now = time.time()
+        payload = json.dumps(results, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, provider, keyword, orientation, int(per_page), payload, now, now)
+            )
+            self._conn.execute(
+                'DELETE FROM search_results WHERE key IN ('
+                ' SELECT key FROM search_results ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def fetch(self, provider, keyword, orientation, per_page, fetcher, refresh_fetcher=None):
+        """キャッシュを使って検索する（なければfetcherで取得して保存する）
+
+        refresh_fetcherは古い結果を裏で更新するときに使う取得関数（省略時はfetcher）。
+        呼び出し元の締め切り・キャンセルに縛られない関数を渡す。
+        """
+        cached = self.get(provider, keyword, orientation, per_page)
+        if cached is not None:
+            results, fresh = cached
+            if fresh:
+                self.hits += 1
+                return results
+            if self.stale_while_revalidate:
+                # 古い結果をすぐに返し、最新の結果は裏で取得する
+                self.stale_hits += 1
+                self._refresh(provider, keyword, orientation, per_page, refresh_fetcher or fetcher)
+                return results
+
+        self.misses += 1
+        return self._store(provider, keyword, orientation, per_page, fetcher())
+
+    def _store(self, provider, keyword, orientation, per_page, results):
+        """取得した結果を保存する（空の結果はエラーの可能性があるため保存しない）"""
+        if results:
+            self.put(provider, keyword, orientation, per_page, results)
+        return results
+
+    def _refresh(self, provider, keyword, orientation, per_page, fetcher):
+        """バックグラウンドで結果を更新する"""
+        key = self.make_key(provider, keyword, orientation, per_page)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_pool is None:
+                self._refresh_pool = ThreadPoolExecutor(
+                    max_workers=self._refresh_workers, thread_name_prefix='search-cache'
+                )
+
+        def refresh():
+            try:
+                self._store(provider, keyword, orientation, per_page, fetcher())
+                self.refreshes += 1
+            except Exception as e:
+                print(f"検索キャッシュ更新エラー: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_pool.submit(refresh)
+
+    def stats(self):
+        """キャッシュの統計を返す"""
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM search_results').fetchone()[0]
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes
+        }
+
+    def clear(self):
+        """キャッシュをすべて削除する"""
+        with self._lock:
+            self._conn.execute('DELETE FROM search_results')
+            self._conn.commit()
+
+    def close(self):
+        """更新の完了を待ってから接続を閉じる"""
+        if self._refresh_pool is not None:
+            self._refresh_pool.shutdown(wait=True)
+            self._refresh_pool = None
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_search_cache():
+    """プロセス内で共有するSearchCacheを返す"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SearchCache()
+        return _shared_cache
@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import time
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_transport import HttpTransport
+from media_search import MediaSearch
+
+
+def _pixabay_body(count):
+    return {'hits': [
+        {'id': i, 'tags': 'cat', 'largeImageURL': f"http://img/{i}.jpg",
+         'webformatURL': f"http://img/{i}_s.jpg", 'pageURL': f"http://page/{i}"}
+        for i in range(count)
+    ]}
+
+
+def _pexels_body(count):
+    return {'photos': [
+        {'id': i, 'alt': 'cat', 'src': {'large': f"http://img/{i}.jpg", 'medium': f"http://img/{i}_s.jpg"},
+         'url': f"http://page/{i}"}
+        for i in range(count)
+    ]}
+
+
+def _unsplash_body(count):
+    return {'results': [
+        {'id': str(i), 'description': 'cat', 'urls': {'regular': f"http://img/{i}", 'small': f"http://img/{i}_s"},
+         'links': {'html': f"http://page/{i}"}}
+        for i in range(count)
+    ]}
+
+
+class StandIn:
+    """検索APIの代わりに応答するローカルのHTTPサーバー（遅延・503応答を指定可能）"""
+
+    def __init__(self, body, delay=0.0, status=200):
+        self.body = json.dumps(body).encode('utf-8')
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                time.sleep(stand_in.delay)
+                self.send_response(stand_in.status)
+                self.send_header('Content-Type', 'application/json')
+                if stand_in.status == 503:
+                    # 打ち切られていなければ、トランスポートはすぐに再試行する
+                    self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', str(len(stand_in.body)))
+                self.end_headers()
+                self.wfile.write(stand_in.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/search"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ConcurrentSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.stand_ins = []
+
+    def tearDown(self):
+        for stand_in in self.stand_ins:
+            stand_in.close()
+
+    def _search(self, **stand_ins):
+        """指定したスタンドインだけを設定したMediaSearchを返す"""
+        search = MediaSearch(cache=False)
+        search.transport = HttpTransport(budgets={})
+        search.pixabay_api_key = search.pexels_api_key = search.unsplash_access_key = ''
+        for service, stand_in in stand_ins.items():
+            self.stand_ins.append(stand_in)
+            search.endpoints[service] = stand_in.url
+            setattr(search, 'unsplash_access_key' if service == 'unsplash' else f"{service}_api_key", 'test')
+        return search
+
+    def test_returns_when_max_results_filled_and_cancels_slow_provider(self):
+        slow = StandIn(_pexels_body(0), delay=1.0, status=503)
+        search = self._search(pixabay=StandIn(_pixabay_body(5)), pexels=slow)
+
+        started = time.perf_counter()
+        results = search.search_images('cat', max_results=5, concurrent=True, deadline=5)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(results), 5)
+        self.assertLess(elapsed, 0.8)
+        # 遅いサービスの503応答のあとは再試行されない（打ち切られている）
+        time.sleep(1.5)
+        self.assertEqual(slow.requests, 1)
+
+    def test_deadline_returns_partial_results(self):
+        slow = StandIn(_unsplash_body(0), delay=1.0, status=503)
+        search = self._search(pexels=StandIn(_pexels_body(2)), unsplash=slow)
+
+        started = time.perf_counter()
+        results = search.search_images('cat', max_results=10, concurrent=True, deadline=0.5)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual([result['source'] for result in results], ['pexels', 'pexels'])
+        self.assertGreaterEqual(elapsed, 0.45)
+        self.assertLess(elapsed, 0.9)
+        time.sleep(1.5)
+        self.assertEqual(slow.requests, 1)
+
+    def test_collects_from_all_providers_within_deadline(self):
+        search = self._search(
+            pixabay=StandIn(_pixabay_body(3)),
+            pexels=StandIn(_pexels_body(3), delay=0.5),
+            unsplash=StandIn(_unsplash_body(3), delay=0.5)
+        )
+
+        started = time.perf_counter()
+        results = search.search_images('cat', max_results=9, concurrent=True, deadline=5)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(sorted({result['source'] for result in results}), ['pexels', 'pixabay', 'unsplash'])
+        self.assertEqual(len(results), 9)
+        # 直列なら1秒以上かかる
+        self.assertLess(elapsed, 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
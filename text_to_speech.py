@@ -1,9 +1,22 @@
 import os
-from gtts import gTTS
+import json
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import tempfile
 
+
+def gtts_synthesize(text, lang, slow, output_path):
+    """gTTSで音声を合成してファイルに保存する"""
+    # gTTSはrequestsなどを読み込むため、最初の合成時に読み込む
+    from gtts import gTTS
+    tts = gTTS(text=text, lang=lang, slow=slow)
+    tts.save(output_path)
+
+
 class TextToSpeech:
-    def __init__(self, output_dir="audio"):
+    def __init__(self, output_dir="audio", cache_dir=None, max_workers=4, synthesizer=None):
         """音声合成クラスの初期化"""
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
@@ -11,6 +24,22 @@ class TextToSpeech:
         # デフォルト設定
         self.language = 'ja'
         self.slow = False
+        
+        # 合成済み音声のキャッシュ（テキスト・言語・速度で共有）
+        self.cache_dir = cache_dir if cache_dir else os.path.join(output_dir, '.tts_cache')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+        # 同時に合成する数と、合成処理（テスト用に差し替え可能）
+        self.max_workers = max_workers
+        self.synthesizer = synthesizer if synthesizer else gtts_synthesize
+        
+        # 同じ内容の合成を1回にまとめるためのキーごとのロック
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        
+        # 統計情報
+        self.cache_hits = 0
+        self.cache_misses = 0
     
     def generate_speech(self, text, filename=None, language=None, slow=None):
         """テキストから音声を生成する"""
@@ -30,27 +59,68 @@ class TextToSpeech:
                 filename += '.mp3'
             output_path = os.path.join(self.output_dir, filename)
             
-            # 音声合成
-            tts = gTTS(text=text, lang=lang, slow=speech_slow)
-            tts.save(output_path)
+            # 合成済みの音声を取得（なければ合成）し、出力先にリンク
+            cached_path = self._cached_speech(text, lang, speech_slow)
+            self._link(cached_path, output_path)
             
             return output_path
         except Exception as e:
             print(f"音声合成エラー: {e}")
             return None
     
-    def generate_scene_audio(self, scenes, prefix="scene"):
-        """シーンごとに音声を生成する"""
+    def _cached_speech(self, text, lang, slow):
+        """キャッシュ済みの音声のパスを返す（なければ合成して保存）"""
+        payload = json.dumps([text, lang, slow], ensure_ascii=False)
+        key = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        cached_path = os.path.join(self.cache_dir, key[:2], key + '.mp3')
+        
+        # 同じキーの合成が並行して走らないようにする
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            if os.path.exists(cached_path):
+                self.cache_hits += 1
+                return cached_path
+            
+            self.cache_misses += 1
+            os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix='.mp3', dir=os.path.dirname(cached_path))
+            os.close(fd)
+            try:
+                self.synthesizer(text, lang, slow, temp_path)
+                os.replace(temp_path, cached_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        
+        return cached_path
+    
+    def _link(self, source_path, output_path):
+        """キャッシュの音声を出力先にハードリンクする（できない場合はコピー）"""
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        try:
+            os.link(source_path, output_path)
+        except OSError:
+            shutil.copyfile(source_path, output_path)
+    
+    def generate_scene_audio(self, scenes, prefix="scene", max_workers=None):
+        """シーンごとに音声を並列で生成する"""
         audio_paths = {}
+        workers = max(1, min(max_workers or self.max_workers, len(scenes) or 1))
         
-        for scene_id, scene_data in scenes.items():
-            scene_text = scene_data['text']
-            filename = f"{prefix}_{scene_id}.mp3"
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                scene_id: pool.submit(self.generate_speech, scene_data['text'], f"{prefix}_{scene_id}.mp3")
+                for scene_id, scene_data in scenes.items()
+            }
             
-            # 音声生成
-            audio_path = self.generate_speech(scene_text, filename)
-            if audio_path:
-                audio_paths[scene_id] = audio_path
+            # シーンの順番どおりに結果を集める
+            for scene_id, future in futures.items():
+                audio_path = future.result()
+                if audio_path:
+                    audio_paths[scene_id] = audio_path
         
         return audio_paths
     
@@ -0,0 +1,45 @@
+"""TikTok動画生成ツールの各クラスをまとめて提供するモジュール
+
+クラスは最初に参照された時点で読み込むため、検索だけ・ハッシュタグ生成だけを行う
+ワーカーはmoviepyやrequestsなどの重いライブラリを読み込まずに起動できる。
+
+    from tiktok_generator import HashtagGenerator  # moviepyは読み込まれない
+"""
+import importlib
+
+# 公開する名前と、定義されているモジュール
+_EXPORTS = {
+    'VideoGenerator': 'video_generator',
+    'ENCODING_PROFILES': 'video_generator',
+    'MediaSearch': 'media_search',
+    'VideoSearch': 'video_search',
+    'select_rendition': 'video_search',
+    'TextToSpeech': 'text_to_speech',
+    'HashtagGenerator': 'hashtag_generator',
+    'AudioMixer': 'audio_mixer',
+    'BatchRunner': 'batch_runner',
+    'SearchCache': 'search_cache',
+    'DownloadManager': 'download_manager',
+    'MediaPrefetcher': 'media_prefetcher',
+    'HttpTransport': 'http_transport',
+    'RenderProfiler': 'render_metrics',
+    'FilterGraphRenderer': 'ffmpeg_backend',
+    'compare_videos': 'ffmpeg_backend'
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    """最初に参照された名前のモジュールを読み込む（PEP 562）"""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    # 2回目以降はモジュールの属性として直接参照される
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
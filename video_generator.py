@@ -1,20 +1,73 @@
 import os
 import time
-from moviepy.editor import (
-    TextClip, ImageClip, VideoFileClip, 
-    CompositeVideoClip, concatenate_videoclips,
-    ColorClip, AudioFileClip
-)
-from moviepy.video.fx.resize import resize
+import uuid
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+# moviepy.editorは全エフェクト・プレビュー機能まで読み込むため、必要なモジュールだけを読み込む
+from moviepy.video.VideoClip import TextClip, ImageClip, ColorClip, VideoClip
+from moviepy.video.io.VideoFileClip import VideoFileClip
+from moviepy.video.compositing.concatenate import concatenate_videoclips
+from moviepy.audio.io.AudioFileClip import AudioFileClip
 from moviepy.video.fx.fadein import fadein
 from moviepy.video.fx.fadeout import fadeout
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from PIL import Image
+from ffmpeg_utils import concat_segments, run_ffmpeg
+from render_cache import RasterCache, SegmentCache, file_digest
+from frame_ops import KenBurns, OverlayPatch, fade_gain
+from effects_engine import compile_chain, default_effects
+from audio_mixer import AudioMixer
+from render_metrics import RenderProfiler, maybe_stage
+from media_prefetcher import MediaPrefetcher
+from ffmpeg_backend import FilterGraphRenderer
+
+# エンコードプロファイル（速度とファイルサイズのトレードオフ）
+# crfとbitrateはどちらか一方を指定する。threadsは'auto'で利用可能なコア数から決定
+ENCODING_PROFILES = {
+    'draft': {'preset': 'ultrafast', 'crf': 30, 'bitrate': None, 'threads': 'auto', 'tune': 'fastdecode', 'audio_bitrate': '96k'},
+    'fast': {'preset': 'veryfast', 'crf': 23, 'bitrate': None, 'threads': 'auto', 'tune': None, 'audio_bitrate': '128k'},
+    'balanced': {'preset': 'medium', 'crf': 21, 'bitrate': None, 'threads': 'auto', 'tune': None, 'audio_bitrate': '160k'},
+    'quality': {'preset': 'slow', 'crf': 18, 'bitrate': None, 'threads': 'auto', 'tune': 'film', 'audio_bitrate': '192k'},
+    'small': {'preset': 'medium', 'crf': None, 'bitrate': '2500k', 'threads': 'auto', 'tune': None, 'audio_bitrate': '128k'}
+}
+
+
+def available_cores():
+    """このプロセスが利用可能なCPUコア数を返す"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
 
 class VideoGenerator:
-    def __init__(self, output_dir="output"):
+    def __init__(self, output_dir="output", cache_dir=None):
         """動画生成クラスの初期化"""
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         
+        # 描画結果のキャッシュ設定
+        self.cache_dir = cache_dir if cache_dir else os.path.join(output_dir, '.cache')
+        self.text_cache = RasterCache(os.path.join(self.cache_dir, 'text'), max_items=128)
+        self.media_cache = RasterCache(os.path.join(self.cache_dir, 'media'), max_items=16)
+        self.segment_cache = SegmentCache(os.path.join(self.cache_dir, 'segments'))
+        
+        # ナレーション・BGMの合成
+        self.audio_mixer = AudioMixer()
+        
+        # 開いているファイルリーダー（書き出し後に解放する）
+        self._open_clips = []
+        
+        # ローカルにないメディアの先読み（必要になった時点で作成）
+        self.prefetcher = None
+        
+        # 計測（enable_profilingで有効化）
+        self.profiler = None
+        self._frame_labels = {}
+        
         # TikTok向けの縦型動画設定
         self.width = 1080
         self.height = 1920
@@ -22,29 +75,90 @@ class VideoGenerator:
         self.font = 'Arial'
         self.font_size = 70
         
+        # 下書き（プレビュー）モード設定
+        self.full_width = self.width
+        self.full_height = self.height
+        self.full_fps = self.fps
+        self.draft = False
+        self.scale = 1.0  # テキストサイズ・位置の倍率
+        
+        # エンコード設定
+        self.encoding_profile = 'balanced'
+        self.encoding = dict(ENCODING_PROFILES[self.encoding_profile])
+        # 下書きモードを解除したときに戻すプロファイル（プロファイル名, 設定）
+        self._full_encoding_profile = None
+        
         # デフォルト設定
         self.scene_duration = 5
         self.add_title = True
         self.add_ending = True
         
-        # エフェクト設定
-        self.effects = {
-            'none': lambda clip: clip,
-            'fade': lambda clip: clip.fx(fadein, 0.5).fx(fadeout, 0.5),
-            'mirror_x': lambda clip: clip.fx(mirror_x),
-            'mirror_y': lambda clip: clip.fx(mirror_y),
-            'black_white': lambda clip: clip.fx(blackwhite),
-            'sepia': lambda clip: clip.fx(colorx, 1.5),
-            'bright': lambda clip: clip.fx(colorx, 1.2),
-            'dark': lambda clip: clip.fx(colorx, 0.8)
-        }
+        # エフェクト設定（名前 -> 1回のフレーム処理にまとめたEffectChain）
+        self.effects = default_effects()
         
     def create_text_clip(self, text, duration=3, position='center', color='white', bg_color=None, fontsize=None):
         """テキストクリップを作成する"""
+        # 描画済みテキスト（アルファ付き）をキャッシュから取得
+        raster = self._text_raster(text, color, bg_color, fontsize)
+        txt_clip = self._rgba_clip(raster)
+        
+        # 位置設定
+        txt_clip = txt_clip.set_position(self._text_position(position, txt_clip.w, txt_clip.h))
+        
+        # 持続時間設定
+        txt_clip = txt_clip.set_duration(duration)
+        
+        # フェードイン・アウト効果
+        txt_clip = txt_clip.fx(fadein, 0.5).fx(fadeout, 0.5)
+        
+        return txt_clip
+    
+    def _text_raster(self, text, color='white', bg_color=None, fontsize=None):
+        """描画済みのテキスト（RGBA）をキャッシュから取得する"""
         # フォントサイズ設定
-        font_size = fontsize if fontsize else self.font_size
+        font_size = self._px(fontsize if fontsize else self.font_size)
+        wrap_width = self.width - self._px(100)  # 幅に余白を持たせる
+        
+        key = self.text_cache.make_key('text', text, self.font, font_size, color, wrap_width, bg_color)
+        return self.text_cache.get_or_create(
+            key,
+            lambda: self._render_text_raster(text, font_size, color, wrap_width, bg_color)
+        )
+    
+    def _text_position(self, position, width, height):
+        """テキストの左上座標を返す"""
+        x = (self.width - width) // 2
+        if position == 'top':
+            return (x, self._px(100))
+        if position == 'bottom':
+            return (x, self.height - height - self._px(100))
+        return (x, (self.height - height) // 2)
+    
+    def _text_overlay(self, text, position='center', color='white', bg_color=None, fontsize=None):
+        """テキストを静止オーバーレイ（乗算済みRGBA）として用意する"""
+        raster = self._text_raster(text, color, bg_color, fontsize)
+        x, y = self._text_position(position, raster.shape[1], raster.shape[0])
+        return OverlayPatch(raster, x, y, (self.width, self.height))
+    
+    def _composite_overlay(self, base_clip, overlay, fade_duration=0.5):
+        """下地のクリップにオーバーレイを重ねる（範囲内だけを整数演算で合成）"""
+        duration = base_clip.duration
         
-        # テキストクリップの作成
+        def blend(get_frame, t):
+            frame = get_frame(t)
+            gain = fade_gain(t, duration, fade_duration)
+            if gain <= 0:
+                return frame
+            # 共有されているフレーム（動画リーダーのバッファ・キャッシュ済みの画像・使い回すフレームは
+            # 読み取り専用）と、uint8以外のフレームだけをコピーし、その場で作られたフレームは直接書き換える
+            if not frame.flags.writeable or frame.dtype != np.uint8:
+                frame = np.array(frame, dtype=np.uint8)
+            return overlay.blend_into(frame, gain)
+        
+        return base_clip.fl(blend)
+    
+    def _render_text_raster(self, text, font_size, color, wrap_width, bg_color=None):
+        """テキストをRGBA（uint8）の画像として描画する"""
         txt_clip = TextClip(
             text, 
             fontsize=font_size, 
@@ -52,114 +166,232 @@ class VideoGenerator:
             color=color,
             align='center',
             method='caption',
-            size=(self.width - 100, None)  # 幅に余白を持たせる
+            size=(wrap_width, None)
         )
+        rgb = txt_clip.get_frame(0).astype(np.float32)
+        alpha = txt_clip.mask.get_frame(0).astype(np.float32) if txt_clip.mask is not None else np.ones(rgb.shape[:2], np.float32)
         
-        # 背景色がある場合は背景を追加
-        if bg_color:
-            bg = ColorClip(
-                size=(txt_clip.w + 40, txt_clip.h + 40),
-                color=bg_color
-            ).set_duration(duration)
-            
-            txt_clip = txt_clip.set_position('center')
-            txt_clip = CompositeVideoClip([bg, txt_clip])
+        # 背景色がない場合はテキストのみ
+        if not bg_color:
+            raster = np.dstack([rgb, alpha * 255])
+            return np.clip(raster + 0.5, 0, 255).astype(np.uint8)
         
-        # 位置設定
-        if position == 'center':
-            txt_clip = txt_clip.set_position(('center', 'center'))
-        elif position == 'top':
-            txt_clip = txt_clip.set_position(('center', 100))
-        elif position == 'bottom':
-            txt_clip = txt_clip.set_position(('center', self.height - txt_clip.h - 100))
+        # 背景色がある場合は余白20pxの背景の上に合成
+        h, w = alpha.shape
+        pad = self._px(20)
+        bg_alpha = bg_color[3] / 255.0 if len(bg_color) > 3 else 1.0
+        canvas_rgb = np.empty((h + 2 * pad, w + 2 * pad, 3), np.float32)
+        canvas_rgb[:] = np.array(bg_color[:3], np.float32)
+        canvas_alpha = np.full((h + 2 * pad, w + 2 * pad), bg_alpha, np.float32)
         
-        # 持続時間設定
-        txt_clip = txt_clip.set_duration(duration)
+        region_rgb = canvas_rgb[pad:pad + h, pad:pad + w]
+        region_alpha = canvas_alpha[pad:pad + h, pad:pad + w]
+        out_alpha = alpha + region_alpha * (1 - alpha)
+        safe_alpha = np.where(out_alpha > 0, out_alpha, 1)[:, :, None]
+        region_rgb[:] = (rgb * alpha[:, :, None] + region_rgb * (region_alpha * (1 - alpha))[:, :, None]) / safe_alpha
+        region_alpha[:] = out_alpha
         
-        # フェードイン・アウト効果
-        txt_clip = txt_clip.fx(fadein, 0.5).fx(fadeout, 0.5)
+        raster = np.dstack([canvas_rgb, canvas_alpha * 255])
+        return np.clip(raster + 0.5, 0, 255).astype(np.uint8)
+    
+    def set_draft_mode(self, enabled=True, scale=0.5, fps=15):
+        """下書き（プレビュー）モードを切り替える"""
+        self.draft = enabled
+        self.scale = scale if enabled else 1.0
         
-        return txt_clip
+        # 解像度は偶数に揃える（yuv420pの制約）
+        self.width = max(2, int(round(self.full_width * self.scale / 2)) * 2)
+        self.height = max(2, int(round(self.full_height * self.scale / 2)) * 2)
+        self.fps = fps if enabled else self.full_fps
+        
+        # 下書きモード中は専用のエンコードプロファイルを使用
+        if enabled and self.encoding_profile != 'draft':
+            self._full_encoding_profile = (self.encoding_profile, self.encoding)
+            self.set_encoding_profile('draft')
+        elif not enabled and self._full_encoding_profile is not None:
+            self.encoding_profile, self.encoding = self._full_encoding_profile
+            self._full_encoding_profile = None
+    
+    def enable_profiling(self, profiler=None):
+        """段階ごと・フレームごとの時間計測を有効にする"""
+        self.profiler = profiler if profiler else RenderProfiler()
+        return self.profiler
+    
+    def _stage(self, name, **labels):
+        """計測が有効な場合に区間の時間を記録する"""
+        return maybe_stage(self.profiler, name, **labels)
+    
+    def _timed_frames(self, clip, name):
+        """計測が有効な場合にフレーム生成ごとの時間を記録するクリップを返す"""
+        if self.profiler is None:
+            return clip
+        return self.profiler.wrap_clip(clip, name, **self._frame_labels)
+    
+    def set_encoding_profile(self, name, **overrides):
+        """エンコードプロファイルを設定する（個別の値はキーワード引数で上書き）"""
+        if name not in ENCODING_PROFILES:
+            raise ValueError(f"不明なエンコードプロファイル: {name}")
+        
+        unknown = set(overrides) - set(ENCODING_PROFILES[name])
+        if unknown:
+            raise ValueError(f"不明なエンコード設定: {', '.join(sorted(unknown))}")
+        
+        self.encoding_profile = name
+        self.encoding = dict(ENCODING_PROFILES[name], **overrides)
+    
+    def _px(self, value):
+        """本番解像度基準のピクセル値を現在の倍率に合わせる"""
+        return max(1, int(round(value * self.scale)))
+    
+    def _rgba_clip(self, raster):
+        """RGBA画像からマスク付きのクリップを作成する"""
+        clip = ImageClip(raster[:, :, :3])
+        mask = ImageClip(raster[:, :, 3] / 255.0, ismask=True)
+        return clip.set_mask(mask)
     
     def create_image_clip(self, image_path, duration=3, zoom=False, effect='none'):
         """画像クリップを作成する"""
-        img_clip = ImageClip(image_path)
+        # TikTok形式にリサイズ・クロップ済みのフレームをキャッシュから取得
+        frame = self._normalized_image(image_path)
         
-        # TikTok形式に合わせてリサイズ
-        # 縦横比を維持しながら、高さまたは幅をTikTok形式に合わせる
-        if img_clip.w / img_clip.h > self.width / self.height:  # 画像が横長の場合
-            new_height = self.height
-            new_width = int(img_clip.w * new_height / img_clip.h)
-            img_clip = img_clip.resize(height=new_height)
-            # 中央部分をクロップ
-            x_offset = (new_width - self.width) // 2
-            img_clip = img_clip.crop(x1=x_offset, y1=0, x2=x_offset + self.width, y2=self.height)
-        else:  # 画像が縦長または正方形の場合
-            new_width = self.width
-            new_height = int(img_clip.h * new_width / img_clip.w)
-            img_clip = img_clip.resize(width=new_width)
-            # 中央部分をクロップ
-            y_offset = (new_height - self.height) // 2 if new_height > self.height else 0
-            img_clip = img_clip.crop(x1=0, y1=y_offset, x2=self.width, y2=y_offset + self.height) if new_height > self.height else img_clip
-        
-        # ズーム効果
+        # ズーム効果（1枚の画像から滑らかにズーム）
         if zoom:
-            zoom_factor = 1.05  # 5%ズーム
-            zoomed_clip = img_clip.resize(zoom_factor)
-            # 中央部分をクロップ
-            x_offset = (zoomed_clip.w - img_clip.w) // 2
-            y_offset = (zoomed_clip.h - img_clip.h) // 2
-            zoomed_clip = zoomed_clip.crop(x1=x_offset, y1=y_offset, x2=x_offset + img_clip.w, y2=y_offset + img_clip.h)
-            
-            # 最初のクリップと最後のクリップを作成
-            start_clip = img_clip.set_duration(duration / 2)
-            end_clip = zoomed_clip.set_duration(duration / 2)
-            
-            # クリップを連結
-            img_clip = concatenate_videoclips([start_clip, end_clip])
+            ken_burns = KenBurns(frame, duration, self.fps, zoom_end=1.05)  # 5%ズーム
+            img_clip = VideoClip(ken_burns.make_frame, duration=duration)
+        else:
+            img_clip = ImageClip(frame)
         
         # 持続時間設定
-        img_clip = img_clip.set_duration(duration)
+        img_clip = self._timed_frames(img_clip.set_duration(duration), 'media_frame')
         
-        # エフェクト適用
-        if effect in self.effects:
-            img_clip = self.effects[effect](img_clip)
-        else:
-            # デフォルトはフェードイン・アウト
-            img_clip = img_clip.fx(fadein, 0.5).fx(fadeout, 0.5)
+        # エフェクト適用（不明な場合はフェードイン・アウト）
+        img_clip = self._apply_effect(img_clip, effect, default='fade')
         
-        return img_clip
+        return self._timed_frames(img_clip, 'effect_frame')
     
     def create_video_clip(self, video_path, duration=None, effect='none'):
         """動画クリップを作成する"""
-        video_clip = VideoFileClip(video_path)
+        # TikTok形式にリサイズ・クロップ済みの動画をキャッシュから取得
+        video_clip = VideoFileClip(self._normalized_video(video_path))
+        self._open_clips.append(video_clip)
         
         # 持続時間の設定
         if duration:
-            # 動画の長さがdurationより短い場合はループ
             if video_clip.duration < duration:
-                n_loops = int(duration / video_clip.duration) + 1
-                video_clip = concatenate_videoclips([video_clip] * n_loops)
-            # 指定の長さにカット
-            video_clip = video_clip.subclip(0, duration)
-        
-        # TikTok形式にリサイズ
-        if video_clip.w / video_clip.h > self.width / self.height:  # 動画が横長の場合
-            video_clip = video_clip.resize(height=self.height)
-            # 中央部分をクロップ
-            x_offset = (video_clip.w - self.width) // 2
-            video_clip = video_clip.crop(x1=x_offset, y1=0, x2=x_offset + self.width, y2=self.height)
-        else:  # 動画が縦長または正方形の場合
-            video_clip = video_clip.resize(width=self.width)
-            # 中央部分をクロップ
-            y_offset = (video_clip.h - self.height) // 2 if video_clip.h > self.height else 0
-            video_clip = video_clip.crop(x1=0, y1=y_offset, x2=self.width, y2=y_offset + self.height) if video_clip.h > self.height else video_clip
+                # 動画の長さがdurationより短い場合はループ
+                video_clip = self._loop_clip(video_clip, duration)
+            else:
+                # 指定の長さにカット
+                video_clip = video_clip.subclip(0, duration)
+        
+        video_clip = self._timed_frames(video_clip, 'media_frame')
         
         # エフェクト適用
-        if effect in self.effects:
-            video_clip = self.effects[effect](video_clip)
+        video_clip = self._apply_effect(video_clip, effect)
         
-        return video_clip
+        return self._timed_frames(video_clip, 'effect_frame')
+    
+    def _apply_effect(self, clip, effect, default=None):
+        """エフェクト（名前または名前のリスト）を1回のフレーム処理として適用する"""
+        chain = self._effect_chain(effect, default)
+        if chain is None:
+            return clip
+        return chain(clip, fps=self.fps)
+    
+    def _effect_chain(self, effect, default=None):
+        """エフェクト（名前または名前のリスト）のEffectChainを返す（不明でdefaultもなければNone）"""
+        if isinstance(effect, str) and effect in self.effects:
+            return self.effects[effect]
+        try:
+            return compile_chain(effect)
+        except (KeyError, TypeError):
+            if default is None:
+                return None
+            return self.effects[default]
+    
+    def _loop_clip(self, clip, duration):
+        """時刻を元動画の長さで折り返し、1つのリーダーのままループ再生する"""
+        # コンテナの長さは音声のパディング分だけ映像より長いことがあるため、映像の全フレーム分を1周期とする
+        # （そのままでは周期の終わりに最後のフレームが重複する）
+        fps = clip.fps or self.fps
+        period = max(1, int(clip.duration * fps + 1e-6)) / fps
+        looped = clip.fl_time(lambda t: t % period, apply_to=['mask', 'audio'])
+        return looped.set_duration(duration)
+    
+    def release_clips(self):
+        """開いている動画・音声ファイルのリーダーを閉じる"""
+        while self._open_clips:
+            clip = self._open_clips.pop()
+            try:
+                clip.close()
+            except Exception as e:
+                print(f"リーダー解放エラー: {e}")
+    
+    def _cover_geometry(self, src_width, src_height):
+        """TikTok形式に合わせるためのリサイズ後サイズとクロップ範囲を計算する"""
+        # 縦横比を維持しながら、高さまたは幅をTikTok形式に合わせる
+        if src_width / src_height > self.width / self.height:  # 横長の場合
+            new_height = self.height
+            new_width = int(src_width * new_height / src_height)
+            # 中央部分をクロップ
+            x_offset = (new_width - self.width) // 2
+            box = (x_offset, 0, x_offset + self.width, self.height)
+        else:  # 縦長または正方形の場合
+            new_width = self.width
+            new_height = int(src_height * new_width / src_width)
+            # 中央部分をクロップ（高さが足りない場合はそのまま）
+            if new_height > self.height:
+                y_offset = (new_height - self.height) // 2
+                box = (0, y_offset, self.width, y_offset + self.height)
+            else:
+                box = (0, 0, new_width, new_height)
+        return (new_width, new_height), box
+    
+    def _normalized_image(self, image_path):
+        """リサイズ・クロップ済みの画像フレームを返す（内容ハッシュでキャッシュ）"""
+        key = self.media_cache.make_key('image', file_digest(image_path), self.width, self.height)
+        return self.media_cache.get_or_create(key, lambda: self._normalize_image(image_path))
+    
+    def _normalize_image(self, image_path):
+        """画像をTikTok形式にリサイズ・クロップする"""
+        with Image.open(image_path) as src:
+            img = src.convert('RGB')
+        
+        size, box = self._cover_geometry(img.width, img.height)
+        img = img.resize(size, Image.LANCZOS).crop(box)
+        return np.asarray(img)
+    
+    def _normalized_video(self, video_path):
+        """リサイズ・クロップ済みの動画ファイルのパスを返す（内容ハッシュでキャッシュ）"""
+        key = self.media_cache.make_key('video', file_digest(video_path), self.width, self.height, self.draft)
+        cached_path = os.path.join(self.media_cache.cache_dir, key[:2], key + '.mp4')
+        if os.path.exists(cached_path):
+            return cached_path
+        
+        infos = ffmpeg_parse_infos(video_path)
+        (new_width, new_height), (x1, y1, x2, y2) = self._cover_geometry(*infos['video_size'])
+        
+        # 一時ファイルに書き出してから置き換え
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        temp_path = f"{cached_path}.{os.getpid()}.tmp.mp4"
+        try:
+            run_ffmpeg([
+                '-i', video_path,
+                '-map', '0:v:0', '-map', '0:a?',
+                '-vf', f'scale={new_width}:{new_height},crop={x2 - x1}:{y2 - y1}:{x1}:{y1},setsar=1',
+                '-c:v', 'libx264',
+                '-preset', 'ultrafast' if self.draft else 'veryfast',
+                '-crf', '23' if self.draft else '18',
+                '-pix_fmt', 'yuv420p',
+                '-c:a', 'aac',
+                temp_path
+            ])
+            os.replace(temp_path, cached_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        return cached_path
     
     def create_scene_clip(self, scene_text, media_paths, scene_duration=5, effect='none', audio_path=None):
         """シーンクリップを作成する"""
@@ -168,16 +400,24 @@ class VideoGenerator:
         # 各メディアの持続時間を計算
         media_duration = scene_duration / len(media_paths) if media_paths else scene_duration
         
+        # フレームが変化しない区間（ズームなしの画像でフェード中でない部分）
+        static_spans = []
+        
         # メディアクリップを作成
         for i, media_path in enumerate(media_paths):
             if media_path.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
                 # 画像の場合
+                zoom = (i % 2 == 0)  # 交互にズーム効果を適用
                 clip = self.create_image_clip(
                     media_path, 
                     duration=media_duration,
-                    zoom=(i % 2 == 0),  # 交互にズーム効果を適用
+                    zoom=zoom,
                     effect=effect
                 )
+                if not zoom:
+                    start, end = self._effect_chain(effect, default='fade').static_range(media_duration)
+                    offset = len(clips) * media_duration
+                    static_spans.append((offset + start, offset + end))
             elif media_path.lower().endswith(('.mp4', '.mov', '.avi')):
                 # 動画の場合
                 clip = self.create_video_clip(
@@ -196,11 +436,11 @@ class VideoGenerator:
             bg_clip = ColorClip(size=(self.width, self.height), color=(0, 0, 0))
             bg_clip = bg_clip.set_duration(scene_duration)
             clips.append(bg_clip)
+            static_spans.append((0, scene_duration))
         
-        # テキストクリップを作成
-        text_clip = self.create_text_clip(
+        # テキストを静止オーバーレイとして用意
+        text_overlay = self._text_overlay(
             scene_text,
-            duration=scene_duration,
             position='bottom',
             color='white',
             bg_color=(0, 0, 0, 128)  # 半透明の黒背景
@@ -218,6 +458,7 @@ class VideoGenerator:
         if audio_path and os.path.exists(audio_path):
             try:
                 audio_clip = AudioFileClip(audio_path)
+                self._open_clips.append(audio_clip)
                 # 動画の長さに合わせてカット
                 if audio_clip.duration > base_clip.duration:
                     audio_clip = audio_clip.subclip(0, base_clip.duration)
@@ -227,35 +468,269 @@ class VideoGenerator:
                 print(f"音声追加エラー: {e}")
         
         # テキストをオーバーレイ
-        scene_clip = CompositeVideoClip([base_clip, text_clip])
+        scene_clip = self._composite_overlay(base_clip, text_overlay)
+        scene_clip = self._timed_frames(scene_clip, 'composite_frame')
         
-        return scene_clip
+        # 静止区間は1回だけ合成したフレームを使い回す
+        return self._freeze_static_spans(scene_clip, static_spans)
     
-    def generate_video(self, scenes, media_dict, output_filename="tiktok_video.mp4", bgm_path=None, audio_dict=None, effects_dict=None, hashtags=None):
-        """動画を生成する"""
-        scene_clips = []
+    def _freeze_static_spans(self, clip, spans, fade_duration=0.5):
+        """フレームが変化しない区間（テキストのフェード中を除く）では最初に合成したフレームを返す"""
+        # 境界の丸め誤差を避けるため前後1フレームずつ狭める
+        margin = 1.0 / self.fps
+        overlay_start, overlay_end = fade_duration, clip.duration - fade_duration
+        spans = [
+            (max(start, overlay_start) + margin, min(end, overlay_end) - margin)
+            for start, end in spans
+        ]
+        spans = [(start, end) for start, end in spans if end > start]
+        if not spans:
+            return clip
+        
+        frames = {}
+        
+        def freeze(get_frame, t):
+            for index, (start, end) in enumerate(spans):
+                if start <= t < end:
+                    frame = frames.get(index)
+                    if frame is None:
+                        frame = np.array(get_frame(t), dtype=np.uint8)
+                        # 使い回すフレームが書き換えられないよう読み取り専用にする
+                        frame.flags.writeable = False
+                        frames[index] = frame
+                    return frame
+            return get_frame(t)
         
-        # タイトルクリップを作成（最初のシーンのテキストを使用）
+        return clip.fl(freeze)
+    
+    def generate_video(self, scenes, media_dict, output_filename="tiktok_video.mp4", bgm_path=None, audio_dict=None, effects_dict=None, hashtags=None, parallel=False, max_workers=None, segment_cache=False, streaming=False, backend='moviepy'):
+        """動画を生成する（backend='ffmpeg'でフィルターグラフを1回のffmpeg実行で書き出す）"""
+        if backend not in ('moviepy', 'ffmpeg'):
+            raise ValueError(f"不明なバックエンド: {backend}")
+        
+        # タイトル・各シーン・エンディングのセグメント定義を作成
+        segment_specs = self._segment_specs(scenes, media_dict, audio_dict, effects_dict, hashtags)
+        
+        # 出力ファイルパスを設定
+        output_path = os.path.join(self.output_dir, output_filename)
+        
+        started = time.time()
+        try:
+            with self._stage('generate_video', output=output_filename):
+                # ffmpegバックエンドではPythonのフレーム処理を行わない
+                if backend == 'ffmpeg':
+                    FilterGraphRenderer(self).render(segment_specs, output_path, bgm_path)
+                # ストリーミングモードではシーンごとにフレームを1つのエンコーダーへ送る
+                elif streaming:
+                    self._render_streaming(segment_specs, output_path, bgm_path)
+                # 並列モード・セグメントキャッシュ使用時はセグメントごとにエンコードして連結
+                elif parallel or segment_cache:
+                    self._render_segments(
+                        segment_specs,
+                        output_path,
+                        bgm_path,
+                        parallel=parallel,
+                        max_workers=max_workers,
+                        use_cache=segment_cache
+                    )
+                else:
+                    self._render_single(segment_specs, output_path, bgm_path)
+        finally:
+            # 書き出しが終わったらファイルリーダーと先読みのスレッドを解放
+            self.release_clips()
+            self._close_prefetcher()
+            
+            # 計測結果をフックに渡す
+            if self.profiler is not None:
+                self.profiler.finish(
+                    output=output_path,
+                    started_at=started,
+                    segments=len(segment_specs),
+                    parallel=parallel,
+                    segment_cache=segment_cache,
+                    streaming=streaming,
+                    backend=backend,
+                    encoding_profile=self.encoding_profile
+                )
+        
+        return output_path
+    
+    def _render_single(self, segment_specs, output_path, bgm_path=None):
+        """全セグメントを連結して1回で書き出す"""
+        scene_clips = [self._build_segment_clip(spec) for spec in self._iter_resolved(segment_specs)]
+        
+        # 全てのクリップを連結
+        final_clip = concatenate_videoclips(scene_clips)
+        
+        # ナレーションとBGMを1つの音声ファイルに合成してAACにエンコード
+        encoded_audio = self._encoded_audio(segment_specs, output_path, bgm_path)
+        
+        # 動画を書き出し
+        try:
+            with self._stage('encode', segment='all'):
+                final_clip.write_videofile(
+                    output_path,
+                    audio=encoded_audio if encoded_audio else False,
+                    **self._write_params(output_path)
+                )
+        finally:
+            if encoded_audio and os.path.exists(encoded_audio):
+                os.remove(encoded_audio)
+        
+        return output_path
+    
+    def _render_streaming(self, segment_specs, output_path, bgm_path=None):
+        """シーンごとにクリップを作成し、フレームを1つのffmpegプロセスに書き込む（メモリは1シーン分）"""
+        encoded_audio = self._encoded_audio(segment_specs, output_path, bgm_path)
+        writer = None
+        try:
+            params = self._write_params(output_path, logger=None)
+            writer = FFMPEG_VideoWriter(
+                output_path,
+                (self.width, self.height),
+                params['fps'],
+                codec=params['codec'],
+                preset=params['preset'],
+                bitrate=params['bitrate'],
+                audiofile=encoded_audio,
+                threads=params['threads'],
+                ffmpeg_params=params['ffmpeg_params']
+            )
+            
+            for spec in self._iter_resolved(segment_specs):
+                clip = self._build_segment_clip(spec)
+                try:
+                    with self._stage('encode', segment=spec['id']):
+                        for frame in clip.iter_frames(fps=params['fps'], dtype='uint8'):
+                            writer.write_frame(frame)
+                finally:
+                    # シーンを書き終えたらすぐにリーダーを解放
+                    clip.close()
+                    self.release_clips()
+        finally:
+            if writer is not None:
+                writer.close()
+            if encoded_audio and os.path.exists(encoded_audio):
+                os.remove(encoded_audio)
+        
+        return output_path
+    
+    def _encoded_audio(self, segment_specs, output_path, bgm_path=None):
+        """合成した音声をAACにエンコードしたファイルを作成する（音声がなければNone）"""
+        mixed_audio = self._mix_audio(segment_specs, output_path, bgm_path)
+        if mixed_audio is None:
+            return None
+        
+        # moviepyのライターは音声ファイルを-acodec copyで多重化するため、WAVのままではmp4に入れられない
+        encoded_audio = self._temp_path(output_path, '.audio.m4a')
+        try:
+            with self._stage('audio_encode'):
+                run_ffmpeg([
+                    '-i', mixed_audio,
+                    '-c:a', 'aac', '-b:a', self.encoding['audio_bitrate'],
+                    encoded_audio
+                ])
+        except Exception:
+            if os.path.exists(encoded_audio):
+                os.remove(encoded_audio)
+            raise
+        finally:
+            os.remove(mixed_audio)
+        return encoded_audio
+    
+    def _mix_audio(self, segment_specs, output_path, bgm_path=None):
+        """各シーンのナレーションとBGMを合成したWAVを作成する（音声がなければNone）"""
+        narration = []
+        start = 0
+        for spec in segment_specs:
+            if spec.get('audio_path'):
+                # ナレーションはシーンの長さでカット
+                narration.append((start, spec['audio_path'], spec['duration']))
+            start += spec['duration']
+        
+        has_bgm = bool(bgm_path and os.path.exists(bgm_path))
+        
+        # ナレーションのないシーンでは動画素材の音声を使う（BGMは素材の音声に対してもダッキングされる）
+        sources = self._source_audio(segment_specs)
+        if not narration and not has_bgm and not sources:
+            return None
+        
+        mixed_path = self._temp_path(output_path, '.mix.wav')
+        with self._stage('audio_mix', narration=len(narration), bgm=has_bgm, sources=len(sources)):
+            self.audio_mixer.mix_to_wav(mixed_path, start, narration, bgm_path if has_bgm else None, sources)
+        return mixed_path
+    
+    def _source_audio(self, segment_specs):
+        """ナレーションのないシーンの動画素材の音声を（開始秒, パス, 秒数）のリストで返す（create_scene_clipと同じ位置に配置）"""
+        sources = []
+        start = 0
+        for spec in segment_specs:
+            media_paths = spec.get('media_paths') or []
+            audio_path = spec.get('audio_path')
+            has_narration = bool(audio_path and os.path.exists(audio_path))
+            if spec['kind'] == 'scene' and media_paths and not has_narration:
+                # ダウンロード中のメディアは完了を待ってパスにする
+                if any(isinstance(item, dict) for item in media_paths):
+                    media_paths = self._media_prefetcher().resolve(media_paths)
+                media_duration = spec['duration'] / len(media_paths) if media_paths else spec['duration']
+                index = 0
+                for media_path in media_paths:
+                    lower = media_path.lower()
+                    if lower.endswith(('.mp4', '.mov', '.avi')):
+                        normalized = self._normalized_video(media_path)
+                        if ffmpeg_parse_infos(normalized).get('audio_found'):
+                            sources.append((start + index * media_duration, normalized, media_duration))
+                    elif not lower.endswith(('.jpg', '.jpeg', '.png', '.bmp')):
+                        # サポートされていないメディア形式はクリップにならない
+                        continue
+                    index += 1
+            start += spec['duration']
+        return sources
+    
+    def render_scene(self, scenes, media_dict, scene_id, output_filename=None, audio_dict=None, effects_dict=None, hashtags=None):
+        """指定したシーン（'title'・'ending'も可）だけを書き出す"""
+        segment_specs = self._segment_specs(scenes, media_dict, audio_dict, effects_dict, hashtags)
+        specs = [spec for spec in segment_specs if spec['id'] == scene_id]
+        if not specs:
+            raise ValueError(f"シーンが見つかりません: {scene_id}")
+        
+        if not output_filename:
+            output_filename = f"preview_{scene_id}.mp4"
+        output_path = os.path.join(self.output_dir, output_filename)
+        
+        try:
+            self._render_single(specs, output_path)
+        finally:
+            self.release_clips()
+            self._close_prefetcher()
+        
+        return output_path
+    
+    def _segment_specs(self, scenes, media_dict, audio_dict=None, effects_dict=None, hashtags=None):
+        """タイトル・各シーン・エンディングのセグメント定義を作成する"""
+        specs = []
+        
+        # タイトルクリップ（最初のシーンのテキストを使用）
         if self.add_title and scenes:
             first_scene_id = list(scenes.keys())[0]
-            title_text = scenes[first_scene_id]['text']
-            title_clip = self.create_text_clip(
-                title_text,
-                duration=3,
-                position='center',
-                color='white',
-                bg_color=(0, 0, 0)
-            )
-            scene_clips.append(title_clip)
+            specs.append({
+                'kind': 'text',
+                'id': 'title',
+                'text': scenes[first_scene_id]['text'],
+                'duration': 3,
+                'bg_color': (0, 0, 0),
+                'fontsize': None
+            })
         
-        # 各シーンのクリップを作成
+        # 各シーンのクリップ
         for scene_id, scene_data in scenes.items():
             scene_text = scene_data['text']
             
             # シーンに対応するメディアを取得
             media_paths = []
             if scene_id in media_dict and media_dict[scene_id]:
-                media_paths = [item['local_path'] for item in media_dict[scene_id]]
+                # ローカルにないメディアは項目のまま渡し、レンダリング中に先読みする
+                media_paths = [item.get('local_path') or item for item in media_dict[scene_id]]
             
             # シーンの長さを決定（文字数に応じて調整）
             text_length = len(scene_text)
@@ -271,17 +746,17 @@ class VideoGenerator:
             if audio_dict and scene_id in audio_dict:
                 audio_path = audio_dict[scene_id]
             
-            # シーンクリップを作成
-            scene_clip = self.create_scene_clip(
-                scene_text, 
-                media_paths, 
-                scene_duration,
-                effect=effect,
-                audio_path=audio_path
-            )
-            scene_clips.append(scene_clip)
+            specs.append({
+                'kind': 'scene',
+                'id': scene_id,
+                'text': scene_text,
+                'media_paths': media_paths,
+                'duration': scene_duration,
+                'effect': effect,
+                'audio_path': audio_path
+            })
         
-        # エンディングクリップを作成
+        # エンディングクリップ
         if self.add_ending:
             ending_text = "ご視聴ありがとうございました！"
             
@@ -289,47 +764,268 @@ class VideoGenerator:
             if hashtags:
                 ending_text += "\n\n" + hashtags
             
-            ending_clip = self.create_text_clip(
-                ending_text,
-                duration=5,
+            specs.append({
+                'kind': 'text',
+                'id': 'ending',
+                'text': ending_text,
+                'duration': 5,
+                'bg_color': (0, 0, 0),
+                'fontsize': 50 if hashtags else 70  # ハッシュタグがある場合はフォントサイズを小さく
+            })
+        
+        return specs
+    
+    def _media_prefetcher(self):
+        """メディアの先読みに使うMediaPrefetcherを返す"""
+        if self.prefetcher is None:
+            self.prefetcher = MediaPrefetcher(download_dir=os.path.join(self.output_dir, 'downloads'))
+        # レンディションは現在の出力サイズ（下書きモードなら縮小サイズ）で選ぶ
+        self.prefetcher.target_size = (self.width, self.height)
+        return self.prefetcher
+    
+    def _close_prefetcher(self):
+        """先読みのスレッドプールを終了する（次の書き出しで必要になれば作り直される）"""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+    
+    def _iter_resolved(self, segment_specs):
+        """メディアをローカルのパスに解決しながらセグメント定義を順に返す"""
+        needs_download = any(
+            isinstance(item, dict)
+            for spec in segment_specs
+            for item in spec.get('media_paths', [])
+        )
+        if not needs_download:
+            return iter(segment_specs)
+        # 次のシーンのメディアは現在のシーンの作成・エンコード中にダウンロードする
+        return self._media_prefetcher().iter_resolved(segment_specs)
+    
+    def _build_segment_clip(self, spec):
+        """セグメント定義からクリップを作成する"""
+        self._frame_labels = {'segment': spec['id']}
+        with self._stage('build_segment', segment=spec['id']):
+            return self._create_segment_clip(spec)
+    
+    def _create_segment_clip(self, spec):
+        """セグメントの種類に応じてクリップを作成する"""
+        if spec['kind'] == 'text':
+            overlay = self._text_overlay(
+                spec['text'],
                 position='center',
                 color='white',
-                bg_color=(0, 0, 0),
-                fontsize=50 if hashtags else 70  # ハッシュタグがある場合はフォントサイズを小さく
+                bg_color=spec['bg_color'],
+                fontsize=spec['fontsize']
+            )
+            # 画面サイズの黒背景に配置（連結時にフレームサイズを揃える）
+            bg_clip = ColorClip(size=(self.width, self.height), color=(0, 0, 0))
+            bg_clip = bg_clip.set_duration(spec['duration'])
+            # フェード以外の区間は静止しているため1回だけ合成する
+            return self._freeze_static_spans(
+                self._composite_overlay(bg_clip, overlay),
+                [(0, spec['duration'])]
             )
-            scene_clips.append(ending_clip)
         
-        # 全てのクリップを連結
-        final_clip = concatenate_videoclips(scene_clips)
+        return self.create_scene_clip(
+            spec['text'],
+            spec['media_paths'],
+            spec['duration'],
+            effect=spec['effect'],
+            audio_path=None  # ナレーションはaudio_mixerでまとめて合成する
+        )
+    
+    def _worker_settings(self):
+        """ワーカープロセスに渡す設定（pickle可能な値のみ）"""
+        return {
+            'output_dir': self.output_dir,
+            'cache_dir': self.cache_dir,
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+            'font': self.font,
+            'font_size': self.font_size,
+            'draft': self.draft,
+            'scale': self.scale,
+            'encoding_profile': self.encoding_profile,
+            'encoding': dict(self.encoding),
+            'profile': self.profiler is not None
+        }
+    
+    def _render_segments(self, segment_specs, output_path, bgm_path=None, parallel=False, max_workers=None, use_cache=False):
+        """セグメントごとにエンコードし、ストリームコピーで連結する"""
+        if not segment_specs:
+            raise ValueError("レンダリングするセグメントがありません")
         
-        # BGMを追加
-        if bgm_path and os.path.exists(bgm_path):
-            try:
-                audio_clip = AudioFileClip(bgm_path)
-                # 動画の長さに合わせてループまたはカット
-                if audio_clip.duration < final_clip.duration:
-                    n_loops = int(final_clip.duration / audio_clip.duration) + 1
-                    audio_clip = concatenate_videoclips([audio_clip] * n_loops)
-                audio_clip = audio_clip.subclip(0, final_clip.duration)
-                # 音量を調整
-                audio_clip = audio_clip.volumex(0.5)
-                # 音声を設定
-                final_clip = final_clip.set_audio(audio_clip)
-            except Exception as e:
-                print(f"BGM追加エラー: {e}")
+        segment_dir = tempfile.mkdtemp(prefix='segments_', dir=self.output_dir)
+        mixed_audio = None
+        pool = None
+        try:
+            if parallel and len(segment_specs) > 1:
+                workers = min(max_workers or available_cores(), len(segment_specs))
+                settings = self._worker_settings()
+                # コアをワーカー間で分け合う
+                settings['encoding']['threads'] = self._resolve_threads(workers)
+                pool = ProcessPoolExecutor(max_workers=workers)
+            
+            # メディアが揃ったセグメントから順にエンコードを始める（次のシーンはその間に先読み）
+            segment_paths = []
+            pending = {}
+            for i, spec in enumerate(self._iter_resolved(segment_specs)):
+                # キャッシュ使用時は入力のハッシュで保存先を決める
+                if use_cache:
+                    path = self.segment_cache.path(self._segment_key(spec))
+                else:
+                    path = os.path.join(segment_dir, f"segment_{i:04d}.mp4")
+                segment_paths.append(path)
+                
+                # キャッシュにないセグメントだけをエンコード
+                if path in pending or (use_cache and self.segment_cache.contains(path)):
+                    continue
+                if pool is not None:
+                    pending[path] = pool.submit(_render_segment, settings, spec, path)
+                else:
+                    self._encode_segment(spec, path)
+                    pending[path] = None
+            
+            # 例外はここで呼び出し元に伝播させる
+            for future in pending.values():
+                if future is None:
+                    continue
+                _, report = future.result()
+                if report and self.profiler is not None:
+                    self.profiler.merge(report)
+            
+            # 映像はストリームコピーで連結し、合成した音声だけをエンコード
+            mixed_audio = self._mix_audio(segment_specs, output_path, bgm_path)
+            with self._stage('concat', segments=len(segment_paths), encoded=len(pending)):
+                concat_segments(
+                    segment_paths,
+                    output_path,
+                    audio_path=mixed_audio,
+                    audio_bitrate=self.encoding['audio_bitrate']
+                )
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            shutil.rmtree(segment_dir, ignore_errors=True)
+            if mixed_audio and os.path.exists(mixed_audio):
+                os.remove(mixed_audio)
         
-        # 出力ファイルパスを設定
-        output_path = os.path.join(self.output_dir, output_filename)
+        return output_path
+    
+    def _segment_key(self, spec):
+        """セグメントの入力（テキスト・メディア・音声・形状・エンコード設定）からキーを作成する"""
+        def file_state(path):
+            if path and os.path.exists(path):
+                stat = os.stat(path)
+                return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+            return [path, None, None]
         
-        # 動画を書き出し
-        final_clip.write_videofile(
-            output_path,
-            fps=self.fps,
-            codec='libx264',
-            audio_codec='aac',
-            temp_audiofile='temp-audio.m4a',
-            remove_temp=True,
-            threads=4
+        inputs = dict(spec)
+        inputs['media_paths'] = [file_state(path) for path in spec.get('media_paths', [])]
+        # 音声は連結後にまとめて付けるので、セグメントのキーには含めない
+        inputs.pop('audio_path', None)
+        
+        return self.segment_cache.make_key(
+            'segment',
+            inputs,
+            self.width,
+            self.height,
+            self.font,
+            self.font_size,
+            self.scale,
+            self._encoder_settings()
         )
+    
+    def _encoder_settings(self):
+        """出力に影響するエンコード設定（連結時に全セグメントで一致している必要がある）"""
+        return {
+            'fps': self.fps,
+            'codec': 'libx264',
+            'preset': self.encoding['preset'],
+            'crf': self.encoding['crf'],
+            'bitrate': self.encoding['bitrate'],
+            'tune': self.encoding['tune'],
+            'audio_codec': 'aac',
+            'audio_fps': 44100,
+            'audio_bitrate': self.encoding['audio_bitrate']
+        }
+    
+    def _resolve_threads(self, workers=1):
+        """エンコードのスレッド数を決定する（'auto'はコア数をワーカー数で割る）"""
+        threads = self.encoding['threads']
+        if threads == 'auto':
+            return max(1, available_cores() // max(1, workers))
+        return int(threads)
+    
+    def _temp_path(self, output_path, suffix):
+        """出力ファイルの隣に、ジョブごとに一意な一時ファイルのパスを作る"""
+        out_dir = os.path.dirname(os.path.abspath(output_path))
+        base = os.path.splitext(os.path.basename(output_path))[0]
+        return os.path.join(out_dir, f".{base}.{uuid.uuid4().hex}{suffix}")
+    
+    def _write_params(self, output_path, logger='bar'):
+        """write_videofileに渡すパラメータを作成する"""
+        settings = self._encoder_settings()
         
-        return output_path
+        ffmpeg_params = []
+        if settings['crf'] is not None and not settings['bitrate']:
+            ffmpeg_params += ['-crf', str(settings['crf'])]
+        if settings['tune']:
+            ffmpeg_params += ['-tune', settings['tune']]
+        
+        # 同時に複数のレンダリングが動いても衝突しない一時音声ファイル
+        temp_audiofile = self._temp_path(output_path, '.temp-audio.m4a')
+        
+        return {
+            'fps': settings['fps'],
+            'codec': settings['codec'],
+            'preset': settings['preset'],
+            'bitrate': settings['bitrate'],
+            'ffmpeg_params': ffmpeg_params or None,
+            'audio_codec': settings['audio_codec'],
+            'audio_fps': settings['audio_fps'],
+            'audio_bitrate': settings['audio_bitrate'],
+            'temp_audiofile': temp_audiofile,
+            'remove_temp': True,
+            'threads': self._resolve_threads(),
+            'logger': logger
+        }
+    
+    def _encode_segment(self, spec, segment_path):
+        """1セグメントを作成してファイルに書き出す"""
+        # 書き出し途中のファイルが残らないよう一時ファイルから置き換える
+        os.makedirs(os.path.dirname(segment_path), exist_ok=True)
+        temp_path = f"{segment_path}.{os.getpid()}.part.mp4"
+        try:
+            clip = self._build_segment_clip(spec)
+            with self._stage('encode', segment=spec['id']):
+                self._write_segment(clip, temp_path)
+            os.replace(temp_path, segment_path)
+        finally:
+            # シーンの書き出しが終わったらすぐにリーダーを解放
+            self.release_clips()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return segment_path
+    
+    def _write_segment(self, clip, segment_path):
+        """1セグメントを映像のみのファイルとしてエンコードする（音声は連結時に付ける）"""
+        clip.write_videofile(segment_path, audio=False, **self._write_params(segment_path, logger=None))
+        return segment_path
+
+
+def _render_segment(settings, spec, segment_path):
+    """ワーカープロセスで1セグメントをレンダリングする"""
+    settings = dict(settings)
+    generator = VideoGenerator(
+        output_dir=settings.pop('output_dir'),
+        cache_dir=settings.pop('cache_dir')
+    )
+    profile = settings.pop('profile', False)
+    for name, value in settings.items():
+        setattr(generator, name, value)
+    
+    # 計測結果は親プロセスで統合する
+    profiler = generator.enable_profiling() if profile else None
+    generator._encode_segment(spec, segment_path)
+    return segment_path, profiler.report() if profiler else None
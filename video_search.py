@@ -1,61 +1,115 @@
 import os
-import requests
-from dotenv import load_dotenv
-import pixabay_python as pxb
+from http_transport import get_transport
+from search_cache import get_search_cache
+from download_manager import get_download_manager
+
+# Pixabayが返す動画のサイズ（小さい順）
+RENDITION_NAMES = ['tiny', 'small', 'medium', 'large']
+
+
+def select_rendition(result, target_width=1080, target_height=1920):
+    """画面を拡大なしで埋められる最小のレンディションを返す（なければ最大のもの）"""
+    renditions = [r for r in result.get('renditions', []) if r.get('url')]
+    if not renditions:
+        # レンディション情報のない結果は従来のURLを使う
+        url = result.get('large_url') or result.get('medium_url') or result.get('url')
+        return {'name': 'default', 'url': url, 'width': result.get('width'), 'height': result.get('height')}
+    
+    def covers(rendition):
+        # 画面を覆うように拡大・切り抜きする際、拡大が不要かどうか
+        return rendition['width'] >= target_width and rendition['height'] >= target_height
+    
+    by_pixels = sorted(renditions, key=lambda r: r['width'] * r['height'])
+    covering = [r for r in by_pixels if covers(r)]
+    if covering:
+        return covering[0]
+    # 覆えるものがない場合は、拡大率が最も小さいもの
+    return min(by_pixels, key=lambda r: (max(target_width / r['width'], target_height / r['height']), -r['width'] * r['height']))
 
-# 環境変数の読み込み
-load_dotenv()
 
 class VideoSearch:
-    def __init__(self):
+    # キャッシュキーに使う動画の向き
+    orientation = 'vertical'
+    
+    def __init__(self, cache=None):
+        """動画検索クラスの初期化（cacheはSearchCache、Noneなら共有キャッシュ、Falseで無効）"""
+        # 環境変数の読み込み（インポート時ではなく初期化時に行う）
+        from dotenv import load_dotenv
+        load_dotenv()
+        
         # APIキーの取得
         self.pixabay_api_key = os.getenv('PIXABAY_API_KEY', '')
         
+        # 検索結果の永続キャッシュ
+        self.cache = get_search_cache() if cache is None else cache
+        
         # APIクライアントの初期化
         self.init_api_clients()
     
     def init_api_clients(self):
         """APIクライアントを初期化する"""
-        # Pixabay
-        if self.pixabay_api_key:
-            self.pixabay_client = pxb.PixabayClient(apiKey=self.pixabay_api_key)
-        else:
-            self.pixabay_client = None
+        # 接続プール・リトライ・レート制限を共有するHTTPクライアント
+        self.transport = get_transport()
+        self.request_timeout = 10
+        
+        # ダウンロードは共有の保存先で重複を避ける
+        self.downloader = get_download_manager()
+        
+        # APIのエンドポイント（テスト用のローカルサーバーに差し替え可能）
+        self.endpoints = {
+            'pixabay': os.getenv('PIXABAY_VIDEO_API_URL', 'https://pixabay.com/api/videos/')
+        }
     
     def search_pixabay_videos(self, keyword, per_page=3):
         """Pixabayから動画を検索する"""
-        if not self.pixabay_client:
+        if not self.pixabay_api_key:
             return []
         
         try:
-            # 日本語キーワードの場合はエンコードする
-            encoded_keyword = requests.utils.quote(keyword)
-            # Pixabayで動画検索
-            search_result = self.pixabay_client.searchVideo(
-                q=encoded_keyword,
-                lang='ja',
-                video_type='all',
-                orientation='vertical',  # TikTok向けに縦長動画
-                per_page=per_page
-            )
+            # Pixabayで動画検索（日本語キーワードはparamsでエンコードされる）
+            params = {
+                'key': self.pixabay_api_key,
+                'q': keyword,
+                'lang': 'ja',
+                'video_type': 'all',
+                'orientation': 'vertical',  # TikTok向けに縦長動画
+                'per_page': max(3, per_page)  # Pixabayは3件以上を指定する必要がある
+            }
+            search_result = self.transport.get(
+                self.endpoints['pixabay'],
+                params=params,
+                provider='pixabay',
+                timeout=self.request_timeout
+            ).json()
             
             results = []
-            if hasattr(search_result, 'hits'):
-                hits_list = list(search_result.hits)
-                for hit in hits_list:
-                    results.append({
-                        'id': hit.id,
-                        'preview_url': hit.videos.tiny.url,
-                        'medium_url': hit.videos.medium.url,
-                        'large_url': hit.videos.large.url,
-                        'source': 'Pixabay',
-                        'source_url': hit.pageURL,
-                        'width': hit.videos.medium.width,
-                        'height': hit.videos.medium.height,
-                        'tags': hit.tags,
-                        'duration': hit.duration,
-                        'type': 'video'
-                    })
+            for hit in search_result.get('hits', [])[:per_page]:
+                videos = hit['videos']
+                renditions = [
+                    {
+                        'name': name,
+                        'url': videos[name]['url'],
+                        'width': videos[name].get('width') or 0,
+                        'height': videos[name].get('height') or 0,
+                        'size': videos[name].get('size')
+                    }
+                    for name in RENDITION_NAMES
+                    if videos.get(name, {}).get('url') and videos[name].get('width') and videos[name].get('height')
+                ]
+                results.append({
+                    'id': hit['id'],
+                    'preview_url': videos['tiny']['url'],
+                    'medium_url': videos['medium']['url'],
+                    'large_url': videos['large']['url'],
+                    'source': 'Pixabay',
+                    'source_url': hit['pageURL'],
+                    'width': videos['medium']['width'],
+                    'height': videos['medium']['height'],
+                    'tags': hit.get('tags', ''),
+                    'duration': hit.get('duration'),
+                    'renditions': renditions,
+                    'type': 'video'
+                })
             return results
         except Exception as e:
             print(f"Pixabay動画検索エラー: {e}")
@@ -66,7 +120,13 @@ class VideoSearch:
         results = []
         
         # Pixabayから検索
-        pixabay_results = self.search_pixabay_videos(keyword, per_page)
+        if self.cache:
+            pixabay_results = self.cache.fetch(
+                'pixabay_video', keyword, self.orientation, per_page,
+                lambda: self.search_pixabay_videos(keyword, per_page)
+            )
+        else:
+            pixabay_results = self.search_pixabay_videos(keyword, per_page)
         results.extend(pixabay_results)
         
         # 将来的に他のAPIからの検索も追加可能
@@ -76,14 +136,15 @@ class VideoSearch:
     def download_video(self, url, save_path):
         """動画をダウンロードする"""
         try:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    file.write(chunk)
-            
-            return save_path
+            return self.downloader.download(url, save_path)
         except Exception as e:
             print(f"動画ダウンロードエラー: {e}")
             return None
+    
+    def download_rendition(self, result, save_path, target_width=1080, target_height=1920):
+        """画面サイズに合った最小のレンディションをダウンロードする"""
+        return self.download_video(select_rendition(result, target_width, target_height)['url'], save_path)
+    
+    def download_videos(self, items, max_workers=None):
+        """(URL, 保存先)のリストを並列でダウンロードする（失敗したものはNone）"""
+        return self.downloader.download_many(items, max_workers)